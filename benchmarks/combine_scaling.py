@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark AudioCombiner decode/effects scaling from 1 to N worker processes
+
+Needs ffmpeg/ffprobe on PATH. Generates synthetic 24 kHz mono 48 kbps chunks
+similar to what edge_tts returns.
+
+Usage:
+    python benchmarks/combine_scaling.py [--chunks 500] [--seconds 20]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydub.generators import WhiteNoise  # noqa: E402
+
+from tts.audio_combiner import AudioCombiner  # noqa: E402
+
+
+def make_chunks(directory, count, seconds):
+    """Write one synthetic chunk and copy it ``count`` times"""
+    template = os.path.join(directory, "template.mp3")
+    (
+        WhiteNoise()
+        .to_audio_segment(duration=seconds * 1000, volume=-20)
+        .set_frame_rate(24000)
+        .set_channels(1)
+        .export(template, format="mp3", bitrate="48k")
+    )
+    with open(template, "rb") as f:
+        data = f.read()
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"chunk_{i:04d}.mp3")
+        with open(path, "wb") as f:
+            f.write(data)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AudioCombiner scaling benchmark")
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"🔧 Generating {args.chunks} chunks of {args.seconds}s...")
+        chunks = make_chunks(tmp, args.chunks, args.seconds)
+        output = os.path.join(tmp, "out.mp3")
+
+        workers = 1
+        baseline = None
+        while True:
+            combiner = AudioCombiner(workers=workers)
+            t0 = time.perf_counter()
+            combiner._load(chunks)
+            elapsed = time.perf_counter() - t0
+            baseline = baseline or elapsed
+            print(
+                f"workers={workers:<3} decode+effects {elapsed:7.2f}s "
+                f"speedup x{baseline / elapsed:.2f}"
+            )
+            if workers >= args.max_workers:
+                break
+            workers = min(workers * 2, args.max_workers)
+
+        t0 = time.perf_counter()
+        AudioCombiner().combine(chunks, output)
+        print(f"full combine (all cores): {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark the pronunciation lexicon on a large synthetic dictionary
+
+Compares the one-pass token trie (tts.lexicon) with one ``re.sub`` per entry
+(extrapolated from a sample) and with a single alternation regex, and checks
+the trie's output against a word-by-word reference on the full dictionary and
+against the regex on a subset.
+
+Usage:
+    python benchmarks/lexicon.py [--entries 100000] [--text-mb 3]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tts.lexicon import Lexicon  # noqa: E402
+
+SYLLABLES = "ba ca da ga ha la ma na pha qua ra sa ta tha va xa bo co do mo no to zi ke".split()
+FILLER = (
+    "một ngày mùa thu trời trong xanh và gió thổi nhẹ qua những hàng cây "
+    "bên đường người ta đi làm về muộn hơn thường lệ"
+).split()
+
+
+def make_entries(rng, count):
+    """Brand-like names, acronyms and multi-word foreign names"""
+    entries = {}
+    while len(entries) < count:
+        kind = rng.random()
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if kind < 0.7:
+            term = word.capitalize()
+        elif kind < 0.85:
+            term = f"{word[:3].upper()}-{rng.randint(1, 99)}"
+        else:
+            second = "".join(rng.choice(SYLLABLES) for _ in range(2))
+            term = f"{word.capitalize()} {second.capitalize()}"
+        entries[term] = " ".join(rng.choice(SYLLABLES) for _ in range(3))
+    return entries
+
+
+def make_text(rng, terms, size_mb, density=0.02):
+    words = []
+    size = 0
+    while size < size_mb * 1024 * 1024:
+        word = rng.choice(terms) if rng.random() < density else rng.choice(FILLER)
+        if rng.random() < 0.08:
+            word += rng.choice(".,")
+        words.append(word)
+        size += len(word.encode("utf-8")) + 1
+    return " ".join(words)
+
+
+def reference(entries, text):
+    """Expected output for ``make_text`` text, computed word by word.
+
+    Terms are at most two words and punctuation only ever trails a word, so
+    at each word the two-word term wins over the one-word one.
+    """
+    words = unicodedata.normalize("NFC", text).split(" ")
+    out = []
+    i = 0
+    while i < len(words):
+        word = words[i]
+        if word[-1:] not in ".," and i + 1 < len(words):
+            second = words[i + 1].rstrip(".,")
+            pair = f"{word} {second}"
+            if pair in entries:
+                out.append(entries[pair] + words[i + 1][len(second):])
+                i += 2
+                continue
+        bare = word.rstrip(".,")
+        out.append(entries.get(bare, bare) + word[len(bare):])
+        i += 1
+    return " ".join(out)
+
+
+def alternation(entries):
+    terms = sorted(entries, key=len, reverse=True)
+    return re.compile(r"(?<!\w)(?:" + "|".join(map(re.escape, terms)) + r")(?!\w)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lexicon benchmark")
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--text-mb", type=float, default=3)
+    parser.add_argument("--sample", type=int, default=200, help="Entries timed for re.sub")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"🔧 Generating {args.entries} entries and {args.text_mb} MB of text...")
+    entries = make_entries(rng, args.entries)
+    text = make_text(rng, list(entries), args.text_mb)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dict_path = os.path.join(tmp, "lexicon.txt")
+        with open(dict_path, "w", encoding="utf-8") as f:
+            f.writelines(f"{k} = {v}\n" for k, v in entries.items())
+
+        t0 = time.perf_counter()
+        lexicon = Lexicon.load(dict_path, cache_path=tmp)
+        compile_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        lexicon = Lexicon.load(dict_path, cache_path=tmp)
+        cached_s = time.perf_counter() - t0
+        pickles = [n for n in os.listdir(tmp) if n.endswith(".pickle")]
+        cache_mb = os.path.getsize(os.path.join(tmp, pickles[0])) / 1024 / 1024
+
+    t0 = time.perf_counter()
+    result = lexicon.apply(text)
+    trie_s = time.perf_counter() - t0
+    correct = result == reference(entries, text)
+
+    sample = rng.sample(list(entries), min(args.sample, len(entries)))
+    t0 = time.perf_counter()
+    naive = text
+    for term in sample:
+        naive = re.sub(
+            r"(?<!\w)" + re.escape(term) + r"(?!\w)", entries[term].replace("\\", r"\\"), naive
+        )
+    per_entry_s = (time.perf_counter() - t0) / len(sample)
+
+    subset = dict(list(entries.items())[: min(2000, len(entries))])
+    small = Lexicon.parse(f"{k} = {v}" for k, v in subset.items())
+    pattern = alternation(subset)
+    t0 = time.perf_counter()
+    expected = pattern.sub(lambda m: subset[m.group()], text)
+    regex_s = time.perf_counter() - t0
+    matches = small.apply(text) == expected
+
+    mb = len(text.encode("utf-8")) / 1024 / 1024
+    print(f"\n== {len(entries)} entries, {mb:.1f} MB text ==")
+    print(f"compile            {compile_s:7.2f} s  (cache {cache_mb:.1f} MB)")
+    print(f"load from cache    {cached_s:7.2f} s")
+    print(f"trie, one pass     {trie_s:7.2f} s  ({mb / trie_s:.1f} MB/s)")
+    print(
+        f"re.sub per entry   {per_entry_s * len(entries):7.0f} s  "
+        f"(extrapolated from {len(sample)} entries)"
+    )
+    print(f"alternation regex  {regex_s:7.2f} s  ({len(subset)} entries only)")
+    print(f"{'✅' if correct else '❌'} trie output matches the reference on all entries")
+    print(f"{'✅' if matches else '❌'} trie output matches the regex on {len(subset)} entries")
+    sys.exit(0 if correct and matches else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the CLI and the desktop application
+
+Usage:
+    python benchmarks/startup.py [--runs 5] [--exe dist/DocumentToSpeech/DocumentToSpeech]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(stderr):
+    """Return {top-level module: cumulative microseconds}"""
+    totals = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match and len(match.group(3)) == 1:
+            totals[match.group(4)] = int(match.group(2))
+    return totals
+
+
+def bench_cli_help(runs):
+    """Measure `python -X importtime main.py --help`"""
+    walls = []
+    imports = {}
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "main.py", "--help"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            errors = [l for l in result.stderr.splitlines() if not l.startswith("import time:")]
+            print(f"❌ main.py --help exited with {result.returncode}:")
+            print("\n".join(errors[-5:]))
+            sys.exit(1)
+        walls.append(time.perf_counter() - t0)
+        imports = parse_importtime(result.stderr)
+
+    print("\n== main.py --help ==")
+    print(f"wall: median {statistics.median(walls) * 1000:.1f} ms over {runs} runs")
+    print(f"imports: {sum(imports.values()) / 1000:.1f} ms total")
+    for name, us in sorted(imports.items(), key=lambda kv: -kv[1])[:10]:
+        print(f"   {us / 1000:8.1f} ms  {name}")
+    heavy = [m for m in ("fitz", "docx", "pydub", "edge_tts", "aiohttp") if m in imports]
+    if heavy:
+        print(f"⚠️ Heavy modules imported on --help: {', '.join(heavy)}")
+
+
+def bench_window(cmd, runs, label):
+    """Measure time from process launch until the Tk window is ready"""
+    env = dict(os.environ, DOCSPEECH_STARTUP_PROBE="1")
+    walls = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(
+            cmd, cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        for line in proc.stdout:
+            if line.strip() == "window-ready":
+                walls.append(time.perf_counter() - t0)
+                break
+        proc.wait()
+
+    print(f"\n== {label} time-to-window ==")
+    if not walls:
+        print("❌ Window never became ready (no display?)")
+        return
+    print(f"median {statistics.median(walls) * 1000:.1f} ms over {len(walls)} runs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure startup time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--exe", help="Built desktop executable to measure as well")
+    args = parser.parse_args()
+
+    bench_cli_help(args.runs)
+    bench_window([sys.executable, "desktop_ui.py"], args.runs, "desktop_ui.py")
+    if args.exe:
+        bench_window([os.path.abspath(args.exe)], args.runs, os.path.basename(args.exe))
+
+
+if __name__ == "__main__":
+    main()
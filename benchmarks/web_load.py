@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Load test for web_ui.py with the mock TTS backend
+
+Starts the Flask app in a subprocess (own working directory, mock backend with
+the given latency/error rate), uploads generated DOCX/PDF documents from many
+clients at once and reports upload/job latency percentiles, throughput, error
+rates, peak memory of the server process tree and output correctness.
+
+Each finished job is checked against its sidecar index: chunk hashes and pages
+must match what the splitter produces for that document, and every chunk's
+audio length must match what the mock backend renders for its text, so audio
+crossed between concurrent jobs is detected.
+
+Needs ffmpeg/ffprobe on PATH.
+
+Usage:
+    python benchmarks/web_load.py [--uploads 40] [--concurrency 8]
+        [--documents 40] [--pages 3] [--latency 0.2] [--error-rate 0.02]
+        [--json results.json]
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tts.audio_index import chunk_hash  # noqa: E402
+from tts.document_reader import DocumentReader  # noqa: E402
+from tts.mock_backend import FRAME_MS, MS_PER_CHAR  # noqa: E402
+from tts.text_splitter import TextSplitter  # noqa: E402
+
+WORDS = (
+    "the chapter opens on a quiet morning while the river keeps rising "
+    "and nobody in the village believes the old warning about the bridge"
+).split()
+
+SERVER = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from werkzeug.serving import make_server
+import web_ui
+server = make_server("127.0.0.1", int(sys.argv[2]), web_ui.app, threaded=True)
+print("ready", flush=True)
+server.serve_forever()
+"""
+
+DOCX_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" ContentType="application/'
+    'vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    "</Types>"
+)
+DOCX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/'
+    '2006/relationships/officeDocument" Target="word/document.xml"/>'
+    "</Relationships>"
+)
+
+
+def make_paragraphs(rng, pages):
+    paragraphs = []
+    for _ in range(pages * 6):
+        sentences = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 18))).capitalize()
+            + "."
+            for _ in range(rng.randint(1, 5))
+        ]
+        paragraphs.append(" ".join(sentences))
+    return paragraphs
+
+
+def make_docx(path, paragraphs):
+    body = "".join(f"<w:p><w:r><w:t>{p}</w:t></w:r></w:p>" for p in paragraphs)
+    document = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f"<w:body>{body}</w:body></w:document>"
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml", DOCX_TYPES)
+        z.writestr("_rels/.rels", DOCX_RELS)
+        z.writestr("word/document.xml", document)
+
+
+def make_pdf(path, paragraphs):
+    import fitz
+
+    doc = fitz.open()
+    for i in range(0, len(paragraphs), 6):
+        page = doc.new_page()
+        page.insert_textbox(
+            fitz.Rect(50, 50, 550, 800), "\n".join(paragraphs[i : i + 6]), fontsize=10
+        )
+    doc.save(path)
+    doc.close()
+
+
+def make_documents(directory, count, pages, seed):
+    """Write ``count`` distinct documents, alternating DOCX and PDF"""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        paragraphs = make_paragraphs(rng, pages)
+        if i % 2:
+            path = os.path.join(directory, f"doc_{i:03d}.pdf")
+            make_pdf(path, paragraphs)
+        else:
+            path = os.path.join(directory, f"doc_{i:03d}.docx")
+            make_docx(path, paragraphs)
+        paths.append(path)
+    return paths
+
+
+def expected_chunks(path):
+    """``[(hash, page, audio_ms)]`` the server should produce for ``path``"""
+    table = TextSplitter.split_sections(DocumentReader.read_sections(path))
+    return [
+        (
+            chunk_hash(text),
+            table.section(i) + 1,
+            max(1, len(text) * MS_PER_CHAR // FRAME_MS) * FRAME_MS,
+        )
+        for i, text in enumerate(table)
+    ]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def tree_rss_kb(pid):
+    """Resident memory of ``pid`` and its descendants (Linux only)"""
+    children = {}
+    rss = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/status") as f:
+                fields = dict(line.split(":", 1) for line in f if ":" in line)
+        except OSError:
+            continue
+        children.setdefault(int(fields["PPid"]), []).append(int(entry))
+        rss[int(entry)] = int(fields.get("VmRSS", "0 kB").split()[0])
+    total, stack = 0, [pid]
+    while stack:
+        p = stack.pop()
+        total += rss.get(p, 0)
+        stack.extend(children.get(p, []))
+    return total
+
+
+class MemorySampler(threading.Thread):
+    def __init__(self, pid, interval=0.2):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_kb = None
+        self.stop = threading.Event()
+
+    def run(self):
+        if not os.path.isdir("/proc"):
+            return
+        while not self.stop.wait(self.interval):
+            rss = tree_rss_kb(self.pid)
+            self.peak_kb = max(self.peak_kb or 0, rss)
+
+
+def encode_multipart(path, fields):
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, value in fields.items():
+        body.write(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"'
+            f"\r\n\r\n{value}\r\n".encode()
+        )
+    body.write(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; '
+        f'filename="{os.path.basename(path)}"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n".encode()
+    )
+    with open(path, "rb") as f:
+        body.write(f.read())
+    body.write(f"\r\n--{boundary}--\r\n".encode())
+    return body.getvalue(), f"multipart/form-data; boundary={boundary}"
+
+
+def run_upload(base_url, path, timeout):
+    """Upload ``path``, wait for its job and download the result"""
+    result = {"document": os.path.basename(path)}
+    data, content_type = encode_multipart(path, {"format": "native"})
+    req = urllib.request.Request(
+        base_url + "/", data=data, headers={"Content-Type": content_type}
+    )
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            job_url = resp.geturl()
+        result["upload_s"] = time.perf_counter() - t0
+        job_id = urllib.parse.urlsplit(job_url).path.rstrip("/").rsplit("/", 1)[1]
+
+        deadline = t0 + timeout
+        while True:
+            with urllib.request.urlopen(f"{base_url}/progress/{job_id}") as resp:
+                job = json.load(resp)
+            if job["status"] != "running":
+                break
+            if time.perf_counter() > deadline:
+                result["error"] = "timeout"
+                return result
+            time.sleep(0.2)
+        result["job_s"] = time.perf_counter() - t0
+        if job["status"] == "error":
+            result["error"] = f"job: {job['error']}"
+            return result
+
+        with urllib.request.urlopen(f"{base_url}/download/{job['output']}") as resp:
+            result["bytes"] = len(resp.read())
+        result["output"] = job["output"]
+    except Exception as e:
+        result["error"] = f"http: {e}"
+    return result
+
+
+def check_output(output_dir, result, expected):
+    """Compare a finished job's index with what its document should produce"""
+    path = os.path.join(output_dir, result["output"] + ".index.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            entries = json.load(f)["chunks"]
+    except (OSError, ValueError, KeyError):
+        return "missing index"
+    if not result["bytes"]:
+        return "empty audio"
+    by_hash = {h: (page, ms) for h, page, ms in expected}
+    problems = 0
+    for entry in entries:
+        if entry["hash"] not in by_hash:
+            return "chunk from another document"
+        page, ms = by_hash[entry["hash"]]
+        length = entry["end_ms"] - entry["start_ms"]
+        if entry["page"] != page or abs(length - ms) > max(60, ms * 0.03):
+            problems += 1
+    if problems:
+        return f"{problems} chunks with wrong page or length"
+    if len(entries) < len(expected):
+        result["partial"] = len(expected) - len(entries)
+    return None
+
+
+def percentiles(values, points=(50, 95, 99)):
+    values = sorted(values)
+    if not values:
+        return {p: None for p in points} | {"max": None}
+    out = {p: values[min(len(values) - 1, len(values) * p // 100)] for p in points}
+    out["max"] = values[-1]
+    return out
+
+
+def format_percentiles(label, stats):
+    parts = [
+        f"{'p' + str(k) if k != 'max' else k} "
+        + ("--" if v is None else f"{v * 1000:.0f} ms")
+        for k, v in stats.items()
+    ]
+    print(f"{label:<16} " + "  ".join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="web_ui.py load test")
+    parser.add_argument("--uploads", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--documents", type=int, default=None,
+        help="Distinct documents (default: one per upload; fewer exercises the cache)",
+    )
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2, help="Mock seconds per request")
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Write the summary to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        doc_dir = os.path.join(tmp, "docs")
+        os.makedirs(doc_dir)
+        count = args.documents or args.uploads
+        print(f"🔧 Generating {count} documents of {args.pages} pages...")
+        docs = make_documents(doc_dir, count, args.pages, args.seed)
+        expected = {os.path.basename(p): expected_chunks(p) for p in docs}
+
+        port = free_port()
+        env = dict(
+            os.environ,
+            DOCSPEECH_BACKEND="mock",
+            DOCSPEECH_MOCK_LATENCY=str(args.latency),
+            DOCSPEECH_MOCK_ERROR_RATE=str(args.error_rate),
+        )
+        server_dir = os.path.join(tmp, "server")
+        os.makedirs(server_dir)
+        server = subprocess.Popen(
+            [sys.executable, "-c", SERVER, ROOT, str(port)],
+            cwd=server_dir, env=env, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, text=True,
+        )
+        try:
+            if server.stdout.readline().strip() != "ready":
+                print("❌ web_ui.py failed to start")
+                sys.exit(1)
+            sampler = MemorySampler(server.pid)
+            sampler.start()
+
+            base_url = f"http://127.0.0.1:{port}"
+            uploads = [docs[i % count] for i in range(args.uploads)]
+            print(
+                f"🚀 {args.uploads} uploads, {args.concurrency} concurrent, "
+                f"mock latency {args.latency}s, error rate {args.error_rate:.0%}"
+            )
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                results = list(
+                    pool.map(lambda p: run_upload(base_url, p, args.timeout), uploads)
+                )
+            wall = time.perf_counter() - t0
+            sampler.stop.set()
+            sampler.join()
+        finally:
+            server.terminate()
+            server.wait()
+
+        output_dir = os.path.join(server_dir, "output", "web")
+        for r in results:
+            if "error" not in r:
+                problem = check_output(output_dir, r, expected[r["document"]])
+                if problem:
+                    r["corrupt"] = problem
+
+    ok = [r for r in results if "error" not in r and "corrupt" not in r]
+    errors = [r for r in results if "error" in r]
+    corrupt = [r for r in results if "corrupt" in r]
+    partial = [r for r in ok if r.get("partial")]
+    summary = {
+        "uploads": args.uploads,
+        "concurrency": args.concurrency,
+        "wall_s": wall,
+        "jobs_per_s": len(ok) / wall,
+        "upload_s": percentiles([r["upload_s"] for r in results if "upload_s" in r]),
+        "job_s": percentiles([r["job_s"] for r in results if "job_s" in r]),
+        "errors": len(errors),
+        "partial": len(partial),
+        "corrupt": len(corrupt),
+        "peak_rss_mb": sampler.peak_kb / 1024 if sampler.peak_kb else None,
+    }
+
+    print(f"\n== web_ui.py, {args.uploads} uploads in {wall:.1f}s ==")
+    format_percentiles("upload latency", summary["upload_s"])
+    format_percentiles("job latency", summary["job_s"])
+    print(f"throughput       {summary['jobs_per_s']:.2f} jobs/s")
+    print(
+        f"errors           {len(errors)} ({len(errors) / args.uploads:.1%}), "
+        f"partial {len(partial)}, corrupt {len(corrupt)}"
+    )
+    if summary["peak_rss_mb"] is not None:
+        print(f"peak memory      {summary['peak_rss_mb']:.0f} MB (server + children)")
+    for r in errors[:5]:
+        print(f"   ❌ {r['document']}: {r['error']}")
+    for r in corrupt[:5]:
+        print(f"   ⚠️ {r['document']}: {r['corrupt']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    sys.exit(1 if corrupt else 0)
+
+
+if __name__ == "__main__":
+    main()
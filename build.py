@@ -53,7 +53,7 @@ def check_dependencies():
     """Check if all required dependencies are installed"""
     print("🔍 Checking dependencies...")
 
-    required_packages = ["python-docx", "PyMuPDF", "pydub", "edge-tts", "pyinstaller"]
+    required_packages = ["PyMuPDF", "pydub", "edge-tts", "pyinstaller"]
 
     missing_packages = []
 
@@ -5,17 +5,30 @@ import threading
 import os
 import subprocess
 import logging
+import multiprocessing
+import queue
 import time
 from pathlib import Path
 
-# Import your TTS modules
-from tts.document_reader import DocumentReader
-from tts.text_splitter import TextSplitter
-from tts.tts_processor import TTSProcessor
-from tts.audio_combiner import AudioCombiner
+# TTS modules pulling in fitz/docx/pydub/edge_tts are imported in
+# process_tts() so the window shows up before they are loaded
+from tts.audio_formats import DEFAULT_PROFILE, output_extension
 from tts.utils import setup_dirs, format_seconds
 
 
+# UI refresh interval and log widget size
+UI_POLL_MS = 100
+MAX_LOG_LINES = 1000
+
+STAGE_STATUS = {
+    "read": "📖 Đang đọc file...",
+    "lexicon": "📚 Đang áp dụng từ điển phát âm...",
+    "split": "✂️ Đang chia nhỏ văn bản...",
+    "synthesize": "🎤 Đang chuyển đổi thành giọng nói...",
+    "combine": "🔄 Đang ghép file audio...",
+}
+
+
 # Configure logging
 def setup_logging():
     log_dir = Path("logs")
@@ -31,7 +44,6 @@ def setup_logging():
     )
 
 
-setup_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -49,12 +61,19 @@ class TTSApp:
         self.file_path = ""
         self.output_path = ""
         self.is_processing = False
+        self.loop = None
+        self.task = None
+
+        # Worker threads never touch widgets; they post events here and a
+        # single poller applies them on the Tk thread every UI_POLL_MS.
+        self.events = queue.Queue()
 
         self.setup_ui()
         self.setup_dirs()
 
         # Bind close event
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(UI_POLL_MS, self.poll_events)
 
     def setup_dirs(self):
         """Initialize directories"""
@@ -241,11 +260,48 @@ class TTSApp:
         pitch_val = int(float(value))
         self.pitch_label.config(text=f"{pitch_val:+d}Hz")
 
+    def post(self, kind, value=None):
+        """Queue a UI update, safe to call from any thread"""
+        self.events.put((kind, value))
+
     def log_message(self, message):
         """Add message to log display"""
-        self.log_text.insert(tk.END, f"{time.strftime('%H:%M:%S')} - {message}\n")
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        self.post("log", f"{time.strftime('%H:%M:%S')} - {message}\n")
+
+    def poll_events(self):
+        """Apply queued UI updates, coalescing everything since the last poll"""
+        lines = []
+        latest = {}
+        calls = []
+        try:
+            while True:
+                kind, value = self.events.get_nowait()
+                if kind == "log":
+                    lines.append(value)
+                elif kind == "call":
+                    calls.append(value)
+                else:
+                    latest[kind] = value
+        except queue.Empty:
+            pass
+
+        if lines:
+            self.log_text.insert(tk.END, "".join(lines[-MAX_LOG_LINES:]))
+            # Keep the log widget a bounded ring buffer
+            excess = int(self.log_text.index("end-1c").split(".")[0]) - MAX_LOG_LINES
+            if excess > 0:
+                self.log_text.delete("1.0", f"{excess + 1}.0")
+            self.log_text.see(tk.END)
+        if "progress" in latest:
+            self.progress.config(value=latest["progress"])
+        if "status" in latest:
+            self.status_label.config(text=latest["status"])
+        if "time" in latest:
+            self.time_label.config(text=latest["time"])
+        for call in calls:
+            call()
+
+        self.root.after(UI_POLL_MS, self.poll_events)
 
     def browse_file(self):
         """Browse for input file"""
@@ -297,6 +353,8 @@ class TTSApp:
         self.is_processing = False
         self.log_message("Đang dừng quá trình...")
         self.status_label.config(text="⏹️ Đang dừng...")
+        if self.loop and self.task:
+            self.loop.call_soon_threadsafe(self.task.cancel)
 
     def run_tts_thread(self):
         """Run TTS in separate thread"""
@@ -304,62 +362,61 @@ class TTSApp:
             # Create new event loop for this thread
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
+            self.loop = loop
+            self.task = loop.create_task(self.process_tts())
 
             # Run the async TTS process
-            loop.run_until_complete(self.process_tts())
+            loop.run_until_complete(self.task)
 
+        except asyncio.CancelledError:
+            self.log_message("Quá trình đã bị dừng")
         except Exception as e:
             logger.exception(f"Error in TTS thread: {e}")
-            self.root.after(0, lambda e=e: self.handle_error(str(e)))
+            self.post("call", lambda e=e: self.handle_error(str(e)))
         finally:
+            self.loop = self.task = None
             loop.close()
 
+    def on_pipeline_event(self, event):
+        """Translate pipeline events into UI updates (worker thread)"""
+        from tts.progress import ChunkRetry, Progress, StageFinished, StageStarted
+
+        if isinstance(event, StageStarted):
+            self.post("status", STAGE_STATUS.get(event.stage, event.stage))
+        elif isinstance(event, StageFinished):
+            self.log_message(f"{event.stage}: {format_seconds(event.seconds)}")
+        elif isinstance(event, ChunkRetry):
+            self.log_message(f"Thử lại đoạn {event.index + 1} (lần {event.attempt})")
+        elif isinstance(event, Progress):
+            finished = event.done + event.failed
+            # Reserve 10% for combining
+            self.post("progress", finished / event.total * 90)
+            eta = (
+                format_seconds(event.eta_seconds)
+                if event.eta_seconds is not None
+                else "--"
+            )
+            self.post(
+                "time",
+                f"{finished}/{event.total} đoạn · {event.chunks_per_sec:.2f} đoạn/s"
+                f" · Còn lại ~{eta}",
+            )
+            if finished % 5 == 0 or finished == event.total:
+                self.log_message(f"Hoàn thành {finished}/{event.total} đoạn")
+
     async def process_tts(self):
         """Main TTS processing function"""
+        from tts.pipeline import convert
+
         start_time = time.time()
 
         try:
             # Prepare output path
             filename = os.path.basename(self.file_path)
-            output_filename = os.path.splitext(filename)[0] + ".mp3"
-            self.output_path = os.path.join(self.output_dir, output_filename)
-
-            # Update UI
-            self.root.after(0, lambda: self.log_message(f"Đọc file: {filename}"))
-            self.root.after(
-                0, lambda: self.status_label.config(text="📖 Đang đọc file...")
-            )
-
-            # Read document
-            if filename.lower().endswith(".docx"):
-                text = DocumentReader.read_docx(self.file_path)
-            elif filename.lower().endswith(".pdf"):
-                text = DocumentReader.read_pdf(self.file_path)
-            else:
-                raise ValueError("Chỉ hỗ trợ file DOCX và PDF")
-
-            if not text or not text.strip():
-                logger.error(f"Đọc xong nhưng text rỗng. Kích thước: {len(text)}")
-                raise ValueError("File rỗng hoặc không đọc được nội dung")
-
-            self.root.after(
-                0, lambda: self.log_message(f"Đọc thành công {len(text)} ký tự")
+            output_filename = os.path.splitext(filename)[0] + output_extension(
+                DEFAULT_PROFILE
             )
-            logger.info(f"Document read: {len(text)} characters")
-
-            # Split into chunks
-            self.root.after(
-                0, lambda: self.status_label.config(text="✂️ Đang chia nhỏ văn bản...")
-            )
-            chunks = TextSplitter.smart_split(text, max_length=2000)
-
-            self.root.after(
-                0, lambda: self.log_message(f"Chia thành {len(chunks)} đoạn")
-            )
-            logger.info(f"Text split into {len(chunks)} chunks")
-
-            if not self.is_processing:
-                return
+            self.output_path = os.path.join(self.output_dir, output_filename)
 
             # Prepare TTS settings
             speed = f"{int(float(self.speed_var.get())):+d}%"
@@ -367,115 +424,45 @@ class TTSApp:
             concurrent = self.concurrent_var.get()
             voice = self.voice_var.get()
 
-            self.root.after(
-                0,
-                lambda: self.log_message(
-                    f"Cài đặt: Giọng={voice}, Tốc độ={speed}, Cao độ={pitch}"
-                ),
-            )
-
-            # Initialize TTS processor
-            tts = TTSProcessor(
-                voice=voice, temp_dir=self.temp_dir, speed=speed, pitch=pitch
+            self.log_message(f"Đọc file: {filename}")
+            self.log_message(f"Cài đặt: Giọng={voice}, Tốc độ={speed}, Cao độ={pitch}")
+
+            result = await convert(
+                self.file_path,
+                self.output_path,
+                self.temp_dir,
+                voice=voice,
+                speed=speed,
+                pitch=pitch,
+                concurrent=concurrent,
+                on_event=self.on_pipeline_event,
             )
-
-            # Process chunks
-            self.root.after(
-                0,
-                lambda: self.status_label.config(
-                    text="🎤 Đang chuyển đổi thành giọng nói..."
-                ),
-            )
-
-            total_chunks = len(chunks)
-            processed = 0
-
-            # Process in batches to show progress
-            batch_size = min(12, concurrent * 2)
-            success_files = []
-
-            for i in range(0, total_chunks, batch_size):
-                if not self.is_processing:
-                    break
-
-                batch = chunks[i : i + batch_size]
-                batch_results = await tts.process_batch(batch, concurrent)
-
-                # Collect successful files
-                for idx, (orig_idx, path, success) in enumerate(batch_results):
-                    if success:
-                        success_files.append(path)
-                    processed += 1
-
-                    # Update progress
-                    progress = (
-                        processed / total_chunks
-                    ) * 90  # Reserve 10% for combining
-                    self.root.after(0, lambda p=progress: self.progress.config(value=p))
-
-                    if processed % 5 == 0 or processed == total_chunks:
-                        self.root.after(
-                            0,
-                            lambda: self.log_message(
-                                f"Hoàn thành {processed}/{total_chunks} đoạn"
-                            ),
-                        )
-
-            if not self.is_processing:
-                self.root.after(0, lambda: self.log_message("Quá trình đã bị dừng"))
-                return
-
-            if not success_files:
-                raise ValueError("Không có đoạn audio nào được tạo thành công")
-
-            # Combine audio files
-            self.root.after(
-                0, lambda: self.status_label.config(text="🔄 Đang ghép file audio...")
-            )
-            self.root.after(0, lambda: self.log_message("Bắt đầu ghép file audio..."))
-
-            combiner = AudioCombiner(pause_ms=300, fade_ms=50)
-            combiner.combine(success_files, self.output_path)
-
-            # Clean up temp files
-            for temp_file in success_files:
-                try:
-                    os.remove(temp_file)
-                except Exception:
-                    pass
+            if result["failed"]:
+                self.log_message(f"⚠️ Có {result['failed']} đoạn lỗi")
 
             # Final update
             elapsed_time = time.time() - start_time
-            self.root.after(0, lambda: self.progress.config(value=100))
-            self.root.after(0, lambda: self.status_label.config(text="✅ Hoàn tất!"))
-            self.root.after(
-                0,
-                lambda: self.time_label.config(
-                    text=f"Thời gian xử lý: {format_seconds(elapsed_time)}"
-                ),
-            )
-            self.root.after(
-                0, lambda: self.log_message(f"Hoàn tất! File đã lưu: {output_filename}")
-            )
-            self.root.after(
-                0,
-                lambda: self.log_message(
-                    f"Thời gian xử lý: {format_seconds(elapsed_time)}"
-                ),
-            )
+            self.post("progress", 100)
+            self.post("status", "✅ Hoàn tất!")
+            self.post("time", f"Thời gian xử lý: {format_seconds(elapsed_time)}")
+            self.log_message(f"Hoàn tất! File đã lưu: {output_filename}")
+            self.log_message(f"Thời gian xử lý: {format_seconds(elapsed_time)}")
 
             logger.info(f"TTS conversion completed: {self.output_path}")
 
             # Enable open button
-            self.root.after(0, lambda: self.btn_open_output.config(state="normal"))
+            self.post("call", lambda: self.btn_open_output.config(state="normal"))
+
+        except asyncio.CancelledError:
+            raise
 
         except Exception as e:
             logger.exception(f"Error during TTS processing: {e}")
-            self.root.after(0, lambda e=e: self.handle_error(str(e)))
+            self.post("call", lambda e=e: self.handle_error(str(e)))
 
         finally:
             # Re-enable controls
-            self.root.after(0, self.reset_controls)
+            self.post("call", self.reset_controls)
 
     def handle_error(self, error_message):
         """Handle errors in UI thread"""
@@ -537,6 +524,16 @@ def main():
         # Set application icon (optional)
         # root.iconbitmap("icon.ico")  # Uncomment if you have an icon file
         TTSApp(root)
+
+        # Used by benchmarks/startup.py to measure time-to-window
+        if os.environ.get("DOCSPEECH_STARTUP_PROBE"):
+
+            def probe():
+                print("window-ready", flush=True)
+                root.destroy()
+
+            root.after_idle(probe)
+
         root.mainloop()
 
     except Exception as e:
@@ -545,4 +542,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # Needed for the decode/OCR process pools in a frozen (PyInstaller) build
+    multiprocessing.freeze_support()
+    setup_logging()
     main()
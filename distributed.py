@@ -0,0 +1,89 @@
+# distributed.py
+# Chạy tổng hợp giọng nói trên nhiều máy:
+#   python distributed.py coordinator book.pdf --port 8765
+#   python distributed.py worker http://<coordinator>:8765 --concurrent 4
+# Thử cục bộ với backend giả lập:
+#   python distributed.py coordinator book.pdf --local-workers 3 --backend mock
+
+import argparse
+import asyncio
+import logging
+import os
+
+from tts.audio_formats import DEFAULT_PROFILE, output_extension
+from tts.utils import setup_dirs
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="📡 Distributed DOCX/PDF to speech (coordinator / worker)"
+    )
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    coord = sub.add_parser("coordinator", help="Phát hành các chunk và ghép kết quả")
+    coord.add_argument("file", help="Tên file trong thư mục input/")
+    coord.add_argument("--host", default="0.0.0.0")
+    coord.add_argument("--port", type=int, default=8765)
+    coord.add_argument("--voice", default="vi-VN-HoaiMyNeural")
+    coord.add_argument("--speed", default="0%")
+    coord.add_argument("--pitch", default="+0Hz")
+    coord.add_argument(
+        "--lease", type=float, default=120, help="Thời hạn lease mỗi chunk (giây)"
+    )
+    coord.add_argument(
+        "--local-workers", type=int, default=0, help="Số worker chạy trên máy này"
+    )
+    coord.add_argument("--backend", choices=["edge", "mock"], default="edge")
+    coord.add_argument("--lexicon", metavar="FILE", help="Từ điển phát âm")
+
+    work = sub.add_parser("worker", help="Nhận chunk từ coordinator và tổng hợp")
+    work.add_argument("url", help="VD: http://10.0.0.5:8765")
+    work.add_argument("--concurrent", type=int, default=4)
+    work.add_argument("--backend", choices=["edge", "mock"], default="edge")
+
+    args = parser.parse_args()
+
+    if args.mode == "worker":
+        from tts.distributed import run_worker
+
+        asyncio.run(run_worker(args.url, args.concurrent, args.backend))
+        return
+
+    from tts.distributed import run_coordinator
+
+    input_dir, output_dir, temp_dir = setup_dirs()
+    input_path = os.path.join(input_dir, args.file)
+    if not os.path.exists(input_path):
+        logger.error(f"❌ File không tồn tại: {input_path}")
+        return
+    output_path = os.path.join(
+        output_dir, os.path.splitext(args.file)[0] + output_extension(DEFAULT_PROFILE)
+    )
+
+    done, failed = run_coordinator(
+        input_path,
+        output_path,
+        temp_dir,
+        host=args.host,
+        port=args.port,
+        voice=args.voice,
+        speed=args.speed,
+        pitch=args.pitch,
+        lease_seconds=args.lease,
+        local_workers=args.local_workers,
+        backend=args.backend,
+        lexicon=args.lexicon,
+    )
+    logger.info(f"✅ {done} chunks thành công, {failed} lỗi")
+    if done:
+        logger.info(f"🎉 File cuối cùng đã lưu: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
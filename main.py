@@ -5,23 +5,75 @@ import asyncio
 import os
 import logging
 import time
-from tts.document_reader import DocumentReader
-from tts.text_splitter import TextSplitter
-from tts.tts_processor import TTSProcessor
-from tts.audio_combiner import AudioCombiner
+from tts.audio_formats import DEFAULT_PROFILE, FORMAT_PROFILES, output_extension
 from tts.utils import setup_dirs, format_seconds
 
-os.makedirs("logs", exist_ok=True)
 LOG_FILE = "logs/tts_process.log"
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_FILE, mode="w", encoding="utf-8"),
-        logging.StreamHandler(),
-    ],
-)
+
+# Called from __main__ only: the decode/OCR process pools re-import this
+# module in every worker on spawn platforms, and mode="w" would truncate the
+# log of the running conversion
+def setup_logging():
+    os.makedirs("logs", exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        handlers=[
+            logging.FileHandler(LOG_FILE, mode="w", encoding="utf-8"),
+            logging.StreamHandler(),
+        ],
+    )
+
+
+class CliProgress:
+    """Log pipeline events, at most one progress line every few seconds"""
+
+    def __init__(self, logger, interval=2.0):
+        self.logger = logger
+        self.interval = interval
+        self.last = 0.0
+
+    def __call__(self, event):
+        from tts.progress import ChunkRetry, Progress, StageStarted
+
+        if isinstance(event, StageStarted):
+            self.logger.info(STAGE_MESSAGES.get(event.stage, event.stage))
+        elif isinstance(event, ChunkRetry):
+            self.logger.warning(f"🔁 Chunk {event.index + 1} thử lại lần {event.attempt}")
+        elif isinstance(event, Progress):
+            now = time.monotonic()
+            finished = event.done + event.failed == event.total
+            if now - self.last < self.interval and not finished:
+                return
+            self.last = now
+            eta = (
+                format_seconds(event.eta_seconds)
+                if event.eta_seconds is not None
+                else "--"
+            )
+            self.logger.info(
+                f"⏳ {event.done}/{event.total} chunks, "
+                f"{event.chunks_per_sec:.2f} chunk/s, "
+                f"{event.bytes_per_sec / 1024:.0f} KB/s, ETA {eta}"
+            )
+
+
+STAGE_MESSAGES = {
+    "read": "📖 Đọc file...",
+    "lexicon": "📚 Áp dụng từ điển phát âm...",
+    "split": "✂️ Tách chunk...",
+    "synthesize": "🎙️ Bắt đầu chuyển đổi TTS...",
+    "combine": "🔄 Ghép file audio...",
+}
+
+
+async def list_voices(locale):
+    import edge_tts
+
+    for voice in await edge_tts.list_voices():
+        if voice["Locale"].startswith(locale):
+            print(f"{voice['ShortName']:<40} {voice['Gender']}")
 
 
 async def main():
@@ -31,25 +83,83 @@ async def main():
     parser = argparse.ArgumentParser(
         description="📚 Convert DOCX/PDF to speech with Edge TTS"
     )
-    parser.add_argument("file", help="Tên file trong thư mục input/")
+    parser.add_argument("file", nargs="?", help="Tên file trong thư mục input/")
     parser.add_argument(
         "--voice",
         default="vi-VN-HoaiMyNeural",
         help="Tên giọng TTS (mặc định: vi-VN-HoaiMyNeural)",
     )
-    parser.add_argument("--speed", default="0%", help="Tốc độ nói, VD: -10% / +10%")
+    parser.add_argument("--speed", default="0%", help="Tốc độ nói, VD: -10%% / +10%%")
     parser.add_argument("--pitch", default="+0Hz", help="Tông giọng, VD: -20Hz / +20Hz")
     parser.add_argument(
         "--concurrent", type=int, default=6, help="Số chunk xử lý đồng thời"
     )
+    parser.add_argument(
+        "--hedge-ratio",
+        type=float,
+        default=0.1,
+        help="Tỉ lệ request dự phòng tối đa cho chunk chậm (0 = tắt, mặc định: 0.1)",
+    )
+    parser.add_argument(
+        "--coalesce",
+        action="store_true",
+        help=(
+            "Thêm dấu chấm cho đoạn chưa có dấu câu cuối (hội thoại, slide) để "
+            "giữ khoảng ngắt; chỉ thay đổi dấu câu, cách chia chunk vẫn như cũ"
+        ),
+    )
+    parser.add_argument(
+        "--lexicon",
+        metavar="FILE",
+        help="Từ điển phát âm, mỗi dòng: từ = cách đọc",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Bỏ qua index cũ, tạo lại toàn bộ audio",
+    )
+    parser.add_argument(
+        "--keep-sources",
+        action="store_true",
+        help="Giữ audio gốc từng chunk trong temp_chunks/ để lần sửa sau không phải mã hoá lại",
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(FORMAT_PROFILES),
+        default=DEFAULT_PROFILE,
+        help="Định dạng đầu ra (mặc định: native, giữ nguyên bitrate/sample rate nguồn)",
+    )
+    parser.add_argument("--bitrate", help="Ghi đè bitrate đầu ra, VD: 64k")
+    parser.add_argument(
+        "--sample-rate", type=int, help="Ghi đè sample rate đầu ra, VD: 44100"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["edge", "mock"],
+        default="edge",
+        help="mock: giả lập TTS cục bộ để thử nghiệm, không cần mạng",
+    )
+    parser.add_argument(
+        "--list-voices",
+        metavar="LOCALE",
+        nargs="?",
+        const="",
+        help="Liệt kê các giọng có sẵn (lọc theo locale, VD: vi-VN) rồi thoát",
+    )
 
     args = parser.parse_args()
 
+    if args.list_voices is not None:
+        await list_voices(args.list_voices)
+        return
+    if not args.file:
+        parser.error("cần chỉ định file")
+
     # Tạo thư mục cần thiết
     input_dir, output_dir, temp_dir = setup_dirs()
 
     input_path = os.path.join(input_dir, args.file)
-    output_file = os.path.splitext(args.file)[0] + ".mp3"
+    output_file = os.path.splitext(args.file)[0] + output_extension(args.format)
     output_path = os.path.join(output_dir, output_file)
 
     logger.info(f"📁 Input: {input_path}")
@@ -59,80 +169,47 @@ async def main():
         logger.error(f"❌ File không tồn tại: {input_path}")
         return
 
-    # Đọc file
+    # Chỉ import các thư viện nặng khi thực sự chuyển đổi
+    from tts.pipeline import convert
+
     try:
-        if args.file.lower().endswith(".docx"):
-            text = DocumentReader.read_docx(input_path)
-        elif args.file.lower().endswith(".pdf"):
-            text = DocumentReader.read_pdf(input_path)
-        else:
-            logger.error("❌ Chỉ hỗ trợ DOCX hoặc PDF.")
-            return
-    except Exception as e:
-        logger.error(f"❌ Lỗi đọc file: {e}")
+        result = await convert(
+            input_path,
+            output_path,
+            temp_dir,
+            voice=args.voice,
+            speed=args.speed,
+            pitch=args.pitch,
+            concurrent=args.concurrent,
+            profile=args.format,
+            bitrate=args.bitrate,
+            sample_rate=args.sample_rate,
+            max_hedge_ratio=args.hedge_ratio,
+            incremental=not args.full,
+            keep_sources=args.keep_sources,
+            coalesce=args.coalesce,
+            lexicon=args.lexicon,
+            backend=args.backend,
+            on_event=CliProgress(logger),
+        )
+    except ValueError as e:
+        logger.error(f"❌ {e}")
         return
-
-    if not text.strip():
-        logger.error("❌ File rỗng.")
+    except Exception as e:
+        logger.error(f"❌ Lỗi chuyển đổi: {e}")
         return
 
-    # Tách chunk
-    chunks = TextSplitter.smart_split(text, max_length=2000)
-    logger.info(f"📝 Tổng số chunk: {len(chunks)}")
-
-    if chunks:
-        logger.info(f"📄 Chunk 1: {chunks[0][:100]}...")
-
-    # TTS processor
-    tts = TTSProcessor(
-        voice=args.voice, temp_dir=temp_dir, speed=args.speed, pitch=args.pitch
+    logger.info(
+        f"✅ Hoàn tất {result['generated']} chunk mới, dùng lại {result['reused']}"
     )
-
-    # Đo thử 3 chunk đầu để ước tính
-    test_chunks = chunks[:12]
-    t0 = time.time()
-    await tts.process_batch(test_chunks, args.concurrent)
-    t1 = time.time()
-    avg_time_per_chunk = (t1 - t0) / len(test_chunks)
-    estimated_total = avg_time_per_chunk * len(chunks) / args.concurrent
-
-    logger.info(f"⏱️ Avg time per chunk: {format_seconds(avg_time_per_chunk)}")
-    logger.info(f"⏳ Estimated TTS time: {format_seconds(estimated_total)}")
-
-    # Xử lý batch
-    logger.info("🎙️ Bắt đầu chuyển đổi TTS...")
-    results = await tts.process_batch(chunks, max_concurrent=args.concurrent)
-
-    # Lọc file thành công
-    success_files = [path for _, path, ok in results if ok]
-    fail_count = sum(1 for _, _, ok in results if not ok)
-
-    logger.info(f"✅ Hoàn tất {len(success_files)}/{len(chunks)} chunks thành công")
-    if fail_count:
-        logger.warning(f"⚠️ Có {fail_count} chunks lỗi")
-
-    if not success_files:
-        logger.error("❌ Không có audio nào để ghép.")
-        return
-
-    # Ghép file
-    combiner = AudioCombiner()
-    combiner.combine(success_files, output_path)
-
+    if result["failed"]:
+        logger.warning(f"⚠️ Có {result['failed']} chunks lỗi")
     logger.info(f"🎉 File cuối cùng đã lưu: {output_path}")
 
-    # Xoá file tạm
-    for path in success_files:
-        try:
-            os.remove(path)
-        except Exception:
-            pass
-
     if os.path.exists(temp_dir) and not os.listdir(temp_dir):
         os.rmdir(temp_dir)
 
-    logger.info("🧹 Đã xoá file tạm.")
-
 
 if __name__ == "__main__":
+    setup_logging()
     asyncio.run(main())
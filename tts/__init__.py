@@ -1,14 +1,36 @@
 # __init__.py
-from .document_reader import DocumentReader
-from .text_splitter import TextSplitter
-from .tts_processor import TTSProcessor
-from .audio_combiner import AudioCombiner
+# Heavy dependencies (fitz, python-docx, pydub, edge_tts) are only imported
+# when the corresponding class is first accessed.
+import importlib
+
 from .utils import setup_dirs
 
+_LAZY = {
+    "DocumentReader": ".document_reader",
+    "TextSplitter": ".text_splitter",
+    "TTSProcessor": ".tts_processor",
+    "AudioCombiner": ".audio_combiner",
+    "Lexicon": ".lexicon",
+}
+
 __all__ = [
     "DocumentReader",
     "TextSplitter",
     "TTSProcessor",
     "AudioCombiner",
+    "Lexicon",
     "setup_dirs",
 ]
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        module = importlib.import_module(_LAZY[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY))
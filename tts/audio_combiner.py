@@ -1,25 +1,217 @@
 # audio_combiner.py
+import io
+import os
+from multiprocessing import resource_tracker, shared_memory
 from pydub import AudioSegment
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor
+
+from .audio_formats import DEFAULT_PROFILE, FORMAT_PROFILES, nearest_mp3_bitrate
+from .chunk_store import ChunkPack, PackEntry
+
+# Below this many files the process pool costs more than it saves
+MIN_POOL_CHUNKS = 8
+
+
+def _load_chunk(item, fade):
+    """Decode + normalize + fade a chunk file or pack entry.
+
+    Returns the segment and the size of the encoded source in bits.
+    """
+    if isinstance(item, PackEntry):
+        source, bits = io.BytesIO(ChunkPack.read(item)), item.length * 8
+    else:
+        source, bits = item, os.path.getsize(item) * 8
+    audio = AudioSegment.from_file(source, format="mp3").normalize()
+    if len(audio) > fade * 2:
+        audio = audio.fade_in(fade).fade_out(fade)
+    return audio, bits
+
+
+def _decode_chunk(item, fade):
+    """Worker-process side of ``_load_chunk``.
+
+    The PCM is handed back through a shared memory block instead of pickling
+    the AudioSegment; the caller unlinks it.
+    """
+    audio, bits = _load_chunk(item, fade)
+    raw = audio.raw_data
+    params = (audio.sample_width, audio.frame_rate, audio.channels)
+    if os.name != "posix":
+        # Windows frees a mapping once its last handle closes, before the
+        # parent could attach to it, so fall back to returning the bytes.
+        return raw, len(raw), params, bits
+    shm = shared_memory.SharedMemory(create=True, size=max(len(raw), 1))
+    shm.buf[: len(raw)] = raw
+    shm.close()
+    # Ownership passes to the parent, which unlinks the block after reading
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm.name, len(raw), params, bits
+
+
+def _attach_chunk(payload, size, params):
+    if isinstance(payload, bytes):
+        data = payload
+    else:
+        shm = shared_memory.SharedMemory(name=payload)
+        try:
+            data = bytes(shm.buf[:size])
+        finally:
+            shm.close()
+            shm.unlink()
+    sample_width, frame_rate, channels = params
+    return AudioSegment(
+        data=data, sample_width=sample_width, frame_rate=frame_rate, channels=channels
+    )
+
+
+def _release_chunk(payload):
+    """Unlink a block produced by ``_decode_chunk`` that will not be attached."""
+    if isinstance(payload, bytes):
+        return
+    try:
+        shm = shared_memory.SharedMemory(name=payload)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
 
 class AudioCombiner:
-    def __init__(self, pause_ms=300, fade_ms=50):
+    def __init__(
+        self,
+        pause_ms=300,
+        fade_ms=50,
+        profile=DEFAULT_PROFILE,
+        bitrate=None,
+        sample_rate=None,
+        workers=None,
+    ):
         self.pause = AudioSegment.silent(duration=pause_ms)
         self.fade = fade_ms
+        self.profile = FORMAT_PROFILES[profile]
+        # Explicit overrides, otherwise taken from the profile / the source
+        self.bitrate = bitrate
+        self.sample_rate = sample_rate
+        self.workers = workers or os.cpu_count() or 1
+
+    @property
+    def extension(self):
+        return self.profile["ext"]
 
     def combine(self, chunks, output_path):
-        def load(path):
-            audio = AudioSegment.from_file(path, format="mp3").normalize()
-            if len(audio) > self.fade * 2:
-                audio = audio.fade_in(self.fade).fade_out(self.fade)
-            return audio
+        """Join chunk files into ``output_path``.
 
-        with ThreadPoolExecutor(max_workers=4) as ex:
-            segments = list(ex.map(load, chunks))
+        Items of ``chunks`` may also be ready ``AudioSegment`` objects (e.g.
+        audio reused from a previous render). Returns the ``(start_ms, end_ms)``
+        span of every chunk inside the output.
+        """
+        loaded = self._load(chunks)
+        segments = [audio for audio, _ in loaded]
 
-        final = segments[0]
-        for seg in segments[1:]:
-            final += self.pause + seg
+        # Keep the source rate/channels; the silent pause is resampled to match.
+        # Raw PCM is joined once instead of copying the growing result per chunk.
+        rate = max(seg.frame_rate for seg in segments)
+        channels = max(seg.channels for seg in segments)
+        width = max(seg.sample_width for seg in segments)
+
+        def conform(seg):
+            return (
+                seg.set_frame_rate(rate).set_channels(channels).set_sample_width(width)
+            )
+
+        pause = conform(self.pause)
+        parts = []
+        spans = []
+        pos = 0
+        for i, seg in enumerate(segments):
+            if i:
+                parts.append(pause.raw_data)
+                pos += int(pause.frame_count())
+            seg = conform(seg)
+            frames = int(seg.frame_count())
+            spans.append((pos * 1000 // rate, (pos + frames) * 1000 // rate))
+            parts.append(seg.raw_data)
+            pos += frames
+        final = pause._spawn(b"".join(parts))
 
         final = final.normalize()
-        final.export(output_path, format="mp3", bitrate="192k")
+        if self.sample_rate and self.sample_rate != final.frame_rate:
+            final = final.set_frame_rate(self.sample_rate)
+        # Written next to the target and renamed, so a crash while encoding
+        # never leaves a truncated file under the final name
+        tmp_path = f"{output_path}.{os.getpid()}.tmp"
+        try:
+            final.export(
+                tmp_path,
+                format=self.profile["format"],
+                codec=self.profile["codec"],
+                bitrate=self._bitrate(loaded),
+            )
+            os.replace(tmp_path, output_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return spans
+
+    def _load(self, chunks):
+        """Return ``(segment, source_bits)`` per chunk, decoding files in parallel.
+
+        pydub's normalize/fade hold the GIL, so files are decoded in a process
+        pool sized to the available cores rather than in threads.
+        """
+        loaded = [None] * len(chunks)
+        files = []
+        for i, item in enumerate(chunks):
+            if isinstance(item, AudioSegment):
+                loaded[i] = (item, 0)
+            else:
+                files.append(i)
+
+        if len(files) < MIN_POOL_CHUNKS or self.workers == 1:
+            for i in files:
+                loaded[i] = _load_chunk(chunks[i], self.fade)
+            return loaded
+
+        workers = min(self.workers, len(files))
+        futures = {}
+        attached = set()
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                futures = {
+                    i: ex.submit(_decode_chunk, chunks[i], self.fade) for i in files
+                }
+                try:
+                    for i, future in futures.items():
+                        name, size, params, bits = future.result()
+                        attached.add(i)  # _attach_chunk unlinks even if it fails
+                        loaded[i] = (_attach_chunk(name, size, params), bits)
+                except BaseException:
+                    for future in futures.values():
+                        future.cancel()
+                    raise
+        finally:
+            # Workers unregistered their blocks from the resource tracker, so
+            # after a failure the ones never attached must be unlinked here
+            # (the pool has been shut down, every started future is done).
+            for i, future in futures.items():
+                if i in attached or future.cancelled() or future.exception():
+                    continue
+                _release_chunk(future.result()[0])
+        return loaded
+
+    def _bitrate(self, loaded):
+        bitrate = self.bitrate or self.profile["bitrate"]
+        if bitrate:
+            return bitrate
+        # Match the source chunk files: total bits over their total duration
+        bits = sum(b for _, b in loaded)
+        duration_ms = sum(len(audio) for audio, b in loaded if b)
+        if not bits or not duration_ms:
+            return "48k"
+        return nearest_mp3_bitrate(bits / duration_ms)
+
+    @staticmethod
+    def extract(output_path, spans):
+        """Cut the given ``(start_ms, end_ms)`` spans out of an existing output."""
+        previous = AudioSegment.from_file(output_path)
+        return [previous[start:end] for start, end in spans]
@@ -0,0 +1,30 @@
+# audio_formats.py
+# Output format profiles. edge_tts always returns 24 kHz mono MP3 at 48 kbps
+# (the service endpoint does not accept another outputFormat), so every
+# profile keeps the source sample rate and channel count and only chooses
+# how the combined audio is encoded.
+
+# bitrate None means "match the source chunks"
+FORMAT_PROFILES = {
+    "native": {"format": "mp3", "ext": ".mp3", "codec": None, "bitrate": None},
+    "mp3-speech": {"format": "mp3", "ext": ".mp3", "codec": None, "bitrate": "32k"},
+    "opus-speech": {"format": "ogg", "ext": ".ogg", "codec": "libopus", "bitrate": "32k"},
+    "aac-speech": {"format": "mp4", "ext": ".m4a", "codec": "aac", "bitrate": "48k"},
+    "mp3-192k": {"format": "mp3", "ext": ".mp3", "codec": None, "bitrate": "192k"},
+}
+
+DEFAULT_PROFILE = "native"
+
+MP3_BITRATES = (32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+
+
+def output_extension(profile):
+    return FORMAT_PROFILES[profile]["ext"]
+
+
+def nearest_mp3_bitrate(kbps):
+    """Smallest standard MP3 bitrate that does not lose quality vs ``kbps``."""
+    for rate in MP3_BITRATES:
+        if rate >= kbps * 0.95:
+            return f"{rate}k"
+    return f"{MP3_BITRATES[-1]}k"
@@ -0,0 +1,138 @@
+# audio_index.py
+import hashlib
+import json
+import logging
+import os
+from bisect import bisect_left, bisect_right
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+
+
+def chunk_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class AudioIndex:
+    """Sidecar index mapping each chunk of an output file to its offsets.
+
+    Stored next to the audio as ``<output>.index.json``. Each entry records the
+    chunk text hash, the source section (PDF page / DOCX paragraph, 1-based),
+    and the time and byte range of the chunk inside the output file.
+    ``total`` is the number of chunks of the document, which is more than
+    ``len(entries)`` if some failed to synthesize.
+    """
+
+    def __init__(self, settings, entries=None, duration_ms=0, size=0, total=None):
+        self.settings = settings
+        self.entries = entries or []
+        self.duration_ms = duration_ms
+        self.size = size
+        self.total = total
+
+    @property
+    def complete(self):
+        return self.total is not None and len(self.entries) == self.total
+
+    @staticmethod
+    def path_for(output_path):
+        return output_path + ".index.json"
+
+    @classmethod
+    def load(cls, output_path):
+        index_path = cls.path_for(output_path)
+        if not (os.path.exists(output_path) and os.path.exists(index_path)):
+            return None
+        try:
+            with open(index_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable index {index_path}: {e}")
+            return None
+        if data.get("version") != INDEX_VERSION:
+            return None
+        if data.get("size") != os.path.getsize(output_path):
+            # Output was replaced behind our back, offsets no longer hold.
+            logger.warning(f"⚠️ Index {index_path} is stale, ignoring")
+            return None
+        return cls(
+            data["settings"],
+            data["chunks"],
+            data["duration_ms"],
+            data["size"],
+            data.get("total"),
+        )
+
+    @classmethod
+    def build(
+        cls, settings, sections, hashes, spans, output_path, total=None, end_sections=None
+    ):
+        """Build an index for a freshly written output file.
+
+        ``hashes`` are the ``chunk_hash`` of each chunk's text and ``spans``
+        the ``(start_ms, end_ms)`` pairs returned by ``AudioCombiner.combine``.
+        Byte offsets assume a constant bitrate stream, so they are proportional
+        to time. ``end_sections`` (the section each chunk ends in) lets
+        ``seek`` find pages that begin inside a chunk.
+        """
+        size = os.path.getsize(output_path)
+        duration_ms = spans[-1][1] if spans else 0
+        entries = []
+        if end_sections is None:
+            end_sections = sections
+        for section, end_section, key, (start, end) in zip(
+            sections, end_sections, hashes, spans
+        ):
+            entries.append(
+                {
+                    "hash": key,
+                    "page": section + 1,
+                    "end_page": end_section + 1,
+                    "start_ms": start,
+                    "end_ms": end,
+                    "byte_start": size * start // duration_ms if duration_ms else 0,
+                    "byte_end": size * end // duration_ms if duration_ms else 0,
+                }
+            )
+        return cls(settings, entries, duration_ms, size, total)
+
+    def save(self, output_path):
+        data = {
+            "version": INDEX_VERSION,
+            "settings": self.settings,
+            "duration_ms": self.duration_ms,
+            "size": self.size,
+            "total": self.total,
+            "chunks": self.entries,
+        }
+        tmp_path = self.path_for(output_path) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path_for(output_path))
+
+    def reusable(self, settings):
+        """Return ``{hash: (start_ms, end_ms)}`` of audio that can be reused."""
+        if self.settings != settings:
+            return {}
+        return {e["hash"]: (e["start_ms"], e["end_ms"]) for e in self.entries}
+
+    def seek(self, page):
+        """Return the entry of the chunk holding the start of ``page``.
+
+        That is the first chunk that reaches ``page``. Indexes written without
+        ``end_page`` fall back to the first chunk starting on ``page`` or,
+        failing that, the last one starting before it. If no chunk starts at
+        or before ``page``, the first one after it is returned.
+        """
+        entries = self.entries
+        if not entries:
+            return None
+        if all("end_page" in e for e in entries):
+            i = bisect_left(entries, page, key=lambda e: e["end_page"])
+            return entries[i] if i < len(entries) else None
+        i = bisect_right(entries, page, key=lambda e: e["page"]) - 1
+        if i < 0:
+            return entries[0]
+        # First of the chunks sharing that start page
+        return entries[bisect_left(entries, entries[i]["page"], key=lambda e: e["page"])]
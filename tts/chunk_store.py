@@ -0,0 +1,120 @@
+# chunk_store.py
+# Append-only pack file holding the synthesized audio of one job, instead of
+# one chunk_XXXX.mp3 per chunk. Each record is a fixed header followed by the
+# audio blob; the header carries a CRC so a torn write at the tail is detected
+# and cut off when the pack is reopened, keeping every completed entry.
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+PackEntry = namedtuple("PackEntry", "path offset length")
+
+MAGIC = b"DSPK"
+# magic, key (sha1 digest of the chunk text), blob length, crc32 of the blob
+HEADER = struct.Struct("<4s20sII")
+
+
+def _lock_exclusive(f):
+    """Non-blocking exclusive lock, released by the OS if the process dies."""
+    if os.name == "nt":
+        import msvcrt
+
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    else:
+        import fcntl
+
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+class ChunkPack:
+    """Raises ``OSError`` if another process already has ``path`` open."""
+
+    def __init__(self, path, durable=False):
+        self.path = path
+        self.durable = durable
+        self.entries = {}  # key (hex) -> PackEntry
+        self._lock = threading.Lock()
+        self._lock_file = open(path + ".lock", "a+b")
+        try:
+            _lock_exclusive(self._lock_file)
+        except OSError:
+            self._lock_file.close()
+            raise
+        self._file = open(path, "r+b" if os.path.exists(path) else "w+b")
+        self._recover()
+
+    def _recover(self):
+        size = os.fstat(self._file.fileno()).st_size
+        pos = 0
+        if size:
+            with mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                while pos + HEADER.size <= size:
+                    magic, key, length, crc = HEADER.unpack_from(mm, pos)
+                    start = pos + HEADER.size
+                    if magic != MAGIC or start + length > size:
+                        break
+                    if zlib.crc32(mm[start : start + length]) != crc:
+                        break
+                    self.entries[key.hex()] = PackEntry(self.path, start, length)
+                    pos = start + length
+        if pos < size:
+            logger.warning(f"⚠️ Pack {self.path}: dropping {size - pos} bytes of torn tail")
+            self._file.truncate(pos)
+        if self.entries:
+            logger.info(f"♻️ Pack {self.path}: recovered {len(self.entries)} entries")
+        self._file.seek(pos)
+
+    def append(self, key, data):
+        """Append ``data`` under ``key`` (hex sha1) and return its entry."""
+        header = HEADER.pack(MAGIC, bytes.fromhex(key), len(data), zlib.crc32(data))
+        with self._lock:
+            offset = self._file.tell() + HEADER.size
+            self._file.write(header)
+            self._file.write(data)
+            self._file.flush()
+            if self.durable:
+                os.fsync(self._file.fileno())
+            entry = PackEntry(self.path, offset, len(data))
+            self.entries[key] = entry
+            return entry
+
+    def compact(self, keys):
+        """Rewrite the pack keeping only the entries of ``keys``."""
+        tmp = self.path + ".tmp"
+        with self._lock:
+            entries = {}
+            with open(tmp, "wb") as out:
+                for key in dict.fromkeys(keys):
+                    entry = self.entries.get(key)
+                    if entry is None:
+                        continue
+                    data = ChunkPack.read(entry)
+                    out.write(HEADER.pack(MAGIC, bytes.fromhex(key), len(data), zlib.crc32(data)))
+                    entries[key] = PackEntry(self.path, out.tell(), len(data))
+                    out.write(data)
+            self._file.close()
+            os.replace(tmp, self.path)
+            self._file = open(self.path, "r+b")
+            self._file.seek(0, os.SEEK_END)
+            self.entries = entries
+
+    def close(self):
+        self._file.close()
+        self._lock_file.close()
+
+    def remove(self):
+        self.close()
+        os.remove(self.path)
+        os.remove(self.path + ".lock")
+
+    @staticmethod
+    def read(entry):
+        with open(entry.path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm[entry.offset : entry.offset + entry.length]
@@ -0,0 +1,333 @@
+# distributed.py
+# Multi-node synthesis. The coordinator publishes a document's chunks on a
+# lease-based HTTP work queue; workers on other nodes pull chunks, run
+# TTSProcessor and push the audio back. Leases that are not completed in time
+# are handed out again, and the coordinator assembles the output in order.
+import asyncio
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import deque
+
+from .audio_formats import DEFAULT_PROFILE
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(__file__), "..", "distributed.py")
+# Smaller uploads cannot be a synthesized chunk (same bound as TTSProcessor)
+MIN_RESULT_BYTES = 100
+
+
+class WorkQueue:
+    def __init__(self, chunks, lease_seconds=120, max_attempts=3):
+        self.chunks = chunks
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.pending = deque(range(len(chunks)))
+        self.leases = {}  # index -> (lease_id, deadline)
+        self.issued = {}  # lease_id -> index, kept after expiry for late results
+        self.attempts = [0] * len(chunks)
+        self.results = {}  # index -> PackEntry
+        self.failed = set()
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        self._check_finished()
+
+    def _check_finished(self):
+        if len(self.results) + len(self.failed) == len(self.chunks):
+            self.finished.set()
+
+    def _retry(self, index):
+        if self.attempts[index] >= self.max_attempts:
+            logger.error(f"❌ Chunk {index + 1} failed after {self.max_attempts} leases")
+            self.failed.add(index)
+            self._check_finished()
+        else:
+            # Retries go first so the head of the output is not held up
+            self.pending.appendleft(index)
+
+    def _expire(self, now):
+        for index, (_, deadline) in list(self.leases.items()):
+            if deadline <= now:
+                del self.leases[index]
+                logger.warning(f"⚠️ Lease for chunk {index + 1} expired, requeueing")
+                self._retry(index)
+
+    def expire(self):
+        """Requeue chunks whose lease ran out, even if no worker asks for more."""
+        with self.lock:
+            self._expire(time.monotonic())
+
+    def lease(self):
+        """Return ``(index, lease_id)`` of the next chunk, or None."""
+        with self.lock:
+            now = time.monotonic()
+            self._expire(now)
+            if not self.pending:
+                return None
+            index = self.pending.popleft()
+            self.attempts[index] += 1
+            lease_id = uuid.uuid4().hex
+            self.leases[index] = (lease_id, now + self.lease_seconds)
+            self.issued[lease_id] = index
+            return index, lease_id
+
+    def is_open(self, index):
+        with self.lock:
+            return index not in self.results and index not in self.failed
+
+    def valid_lease(self, index, lease_id):
+        """Whether ``lease_id`` was handed out for ``index`` (expired or not)."""
+        with self.lock:
+            return self.issued.get(lease_id) == index
+
+    def complete(self, index, path):
+        """Record audio for ``index``. Late results of expired leases count too."""
+        with self.lock:
+            if index in self.results or index in self.failed:
+                return False
+            self.leases.pop(index, None)
+            if index in self.pending:
+                self.pending.remove(index)
+            self.results[index] = path
+            self._check_finished()
+            return True
+
+    def fail(self, index, lease_id):
+        with self.lock:
+            if self.leases.get(index, (None,))[0] != lease_id:
+                return False
+            del self.leases[index]
+            self._retry(index)
+            return True
+
+    def status(self):
+        with self.lock:
+            return {
+                "total": len(self.chunks),
+                "pending": len(self.pending),
+                "leased": len(self.leases),
+                "done": len(self.results),
+                "failed": len(self.failed),
+            }
+
+
+def create_coordinator_app(queue, job, pack, hashes):
+    """Flask app exposing ``queue``. ``job`` holds the voice settings and the
+    audio pushed by workers is appended to ``pack`` under ``hashes[index]``."""
+    from flask import Flask, jsonify, request
+
+    app = Flask(__name__)
+
+    @app.post("/lease")
+    def lease():
+        if queue.finished.is_set():
+            return "", 410
+        leased = queue.lease()
+        if leased is None:
+            return "", 204
+        index, lease_id = leased
+        return jsonify(index=index, lease=lease_id, text=queue.chunks[index], **job)
+
+    @app.put("/result/<int:index>")
+    def result(index):
+        if not queue.valid_lease(index, request.args.get("lease")):
+            return "", 403
+        if not queue.is_open(index):
+            return "", 409
+        data = request.get_data()
+        if len(data) <= MIN_RESULT_BYTES:
+            return "", 400
+        entry = pack.append(hashes[index], data)
+        queue.complete(index, entry)
+        return "", 204
+
+    @app.post("/fail/<int:index>")
+    def fail(index):
+        queue.fail(index, request.args.get("lease"))
+        return "", 204
+
+    @app.get("/status")
+    def status():
+        return jsonify(queue.status())
+
+    return app
+
+
+def run_coordinator(
+    input_path,
+    output_path,
+    temp_dir,
+    host="0.0.0.0",
+    port=8765,
+    voice="vi-VN-HoaiMyNeural",
+    speed="0%",
+    pitch="+0Hz",
+    lease_seconds=120,
+    local_workers=0,
+    backend="edge",
+    lexicon=None,
+):
+    """Publish ``input_path`` and block until the output is assembled.
+
+    Returns ``(done, failed)`` chunk counts. With ``local_workers``, the
+    output is assembled from what is done if all of them exit early.
+    """
+    from werkzeug.serving import make_server
+
+    from .audio_combiner import AudioCombiner
+    from .audio_index import AudioIndex, chunk_hash
+    from .chunk_store import ChunkPack
+    from .document_reader import DocumentReader
+    from .lexicon import Lexicon
+    from .text_splitter import TextSplitter
+
+    sections = DocumentReader.read_sections(input_path)
+    if lexicon:
+        lexicon = Lexicon.load(lexicon)
+        sections = [lexicon.apply(section) for section in sections]
+    chunks = TextSplitter.split_sections(sections)
+    logger.info(f"📝 Tổng số chunk: {len(chunks)}")
+
+    hashes = [chunk_hash(c) for c in chunks]
+    job = {"voice": voice, "speed": speed, "pitch": pitch}
+    queue = WorkQueue(chunks, lease_seconds=lease_seconds)
+    pack_path = os.path.join(temp_dir, f"coordinator_{uuid.uuid4().hex[:8]}.pack")
+    pack = ChunkPack(pack_path)
+    server = make_server(
+        host, port, create_coordinator_app(queue, job, pack, hashes), threaded=True
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://{'127.0.0.1' if host == '0.0.0.0' else host}:{server.port}"
+    logger.info(f"📡 Coordinator listening on {url}")
+
+    workers = [
+        subprocess.Popen(
+            [sys.executable, WORKER_SCRIPT, "worker", url, "--backend", backend],
+            cwd=os.path.dirname(WORKER_SCRIPT),
+        )
+        for _ in range(local_workers)
+    ]
+
+    try:
+        while not queue.finished.wait(timeout=5):
+            # Expired leases would otherwise only be noticed on the next
+            # lease request, which never comes once every worker is gone
+            queue.expire()
+            logger.info(f"📊 {queue.status()}")
+            if workers and all(proc.poll() is not None for proc in workers):
+                logger.error(
+                    "❌ Tất cả worker cục bộ đã dừng khi còn chunk chưa xong, "
+                    "ghép phần đã có"
+                )
+                break
+        # Let workers see 410 Gone on their next lease request and exit
+        for proc in workers:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.terminate()
+    finally:
+        server.shutdown()
+        for proc in workers:
+            if proc.poll() is None:
+                proc.terminate()
+
+    try:
+        order = sorted(queue.results)
+        if order:
+            combiner = AudioCombiner()
+            spans = combiner.combine([queue.results[i] for i in order], output_path)
+            settings = dict(job, profile=DEFAULT_PROFILE, bitrate=None, sample_rate=None)
+            AudioIndex.build(
+                settings,
+                [chunks.section(i) for i in order],
+                [hashes[i] for i in order],
+                spans,
+                output_path,
+                total=len(chunks),
+                end_sections=[chunks.end_section(i) for i in order],
+            ).save(output_path)
+    finally:
+        pack.remove()
+
+    # Chunks still open when the local workers died count as failed
+    return len(queue.results), len(chunks) - len(queue.results)
+
+
+def _request(method, url, data=None):
+    req = urllib.request.Request(url, data=data, method=method)
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            return resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+async def run_worker(
+    url, concurrent=4, backend="edge", poll_interval=1.0, max_errors=10
+):
+    """Pull chunks from the coordinator at ``url`` until it reports 410 Gone."""
+    from .tts_processor import TTSProcessor
+
+    temp_dir = tempfile.mkdtemp(prefix="worker_")
+
+    async def slot(n):
+        # Each slot writes into its own directory: the same chunk can be
+        # leased to this worker twice and temp files are named by index
+        slot_dir = os.path.join(temp_dir, f"slot_{n}")
+        os.makedirs(slot_dir)
+        processors = {}
+        errors = 0
+        while errors < max_errors:
+            try:
+                status, body = await asyncio.to_thread(_request, "POST", f"{url}/lease")
+            except OSError as e:
+                errors += 1
+                logger.warning(f"⚠️ Coordinator unreachable ({e}), retrying...")
+                await asyncio.sleep(poll_interval * errors)
+                continue
+            errors = 0
+            if status == 410:
+                return
+            if status != 200:
+                await asyncio.sleep(poll_interval)
+                continue
+
+            job = json.loads(body)
+            key = (job["voice"], job["speed"], job["pitch"])
+            if key not in processors:
+                processors[key] = TTSProcessor(
+                    job["voice"], slot_dir, job["speed"], job["pitch"], backend=backend
+                )
+            index, lease_id = job["index"], job["lease"]
+            _, path, ok = await processors[key].process_chunk(job["text"], index)
+            try:
+                if ok:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                    os.remove(path)
+                    await asyncio.to_thread(
+                        _request, "PUT", f"{url}/result/{index}?lease={lease_id}", data
+                    )
+                else:
+                    await asyncio.to_thread(
+                        _request, "POST", f"{url}/fail/{index}?lease={lease_id}"
+                    )
+            except OSError as e:
+                # The lease will expire and the chunk be handed out again
+                logger.warning(f"⚠️ Could not report chunk {index + 1}: {e}")
+
+    try:
+        await asyncio.gather(*(slot(n) for n in range(concurrent)))
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
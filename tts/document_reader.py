@@ -1,21 +1,109 @@
 # document_reader.py
-from docx import Document
-import fitz  # PyMuPDF
+# PyMuPDF is imported on first use so that reading DOCX does not pay for it.
+import zipfile
+import xml.etree.ElementTree as ET
+
+MIN_TEXT_CHARS = 20
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_PARAGRAPH = _W + "p"
+_BLOCKS = (_W + "p", _W + "tbl", _W + "sdt")
+_TEXT = _W + "t"
+_SPACES = (_W + "tab", _W + "br", _W + "cr")
+# Word writes drawings (text boxes) twice: as mc:Choice and as a VML copy
+# under mc:Fallback for older readers
+_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+
 
 class DocumentReader:
     @staticmethod
     def read_docx(file_path):
-        doc = Document(file_path)
-        return " ".join([p.text for p in doc.paragraphs])
+        return " ".join(DocumentReader.read_docx_paragraphs(file_path))
+
+    @staticmethod
+    def read_docx_paragraphs(file_path):
+        return list(DocumentReader.iter_docx_paragraphs(file_path))
 
     @staticmethod
-    def read_pdf(file_path):
+    def iter_docx_paragraphs(file_path):
+        """Stream paragraphs out of ``word/document.xml`` in reading order.
+
+        Table cells and text boxes are yielded as their own paragraphs; the
+        ``mc:Fallback`` copy of a text box is skipped. Only
+        the main document part is read (media is never touched) and parsed
+        elements are discarded as soon as they are done, so memory stays flat
+        regardless of document size.
+        """
+        with zipfile.ZipFile(file_path) as archive:
+            with archive.open("word/document.xml") as xml:
+                body = None
+                open_paragraphs = []  # text boxes nest paragraphs in paragraphs
+                depth = 0
+                fallback = 0
+                for event, elem in ET.iterparse(xml, events=("start", "end")):
+                    tag = elem.tag
+                    if event == "start":
+                        depth += 1
+                        if tag == _FALLBACK:
+                            fallback += 1
+                        elif fallback:
+                            continue
+                        elif tag == _W + "body":
+                            body = elem
+                        elif tag == _PARAGRAPH:
+                            open_paragraphs.append([])
+                        continue
+
+                    depth -= 1
+                    if tag == _FALLBACK:
+                        fallback -= 1
+                    elif fallback:
+                        continue
+                    elif tag == _TEXT and open_paragraphs:
+                        open_paragraphs[-1].append(elem.text or "")
+                    elif tag in _SPACES and open_paragraphs:
+                        open_paragraphs[-1].append(" ")
+                    elif tag == _PARAGRAPH:
+                        yield "".join(open_paragraphs.pop())
+
+                    # Drop finished top-level blocks from the tree
+                    if body is not None and depth == 2 and tag in _BLOCKS:
+                        body.clear()
+
+    @staticmethod
+    def read_pdf(file_path, ocr=True):
+        pages = DocumentReader.read_pdf_pages(file_path, ocr=ocr)
+        return "".join(page + "\n" for page in pages)
+
+    @staticmethod
+    def read_pdf_pages(file_path, ocr=True):
+        import fitz  # PyMuPDF
+
         doc = fitz.open(file_path)
-        text = ""
+        pages = []
+        scanned = []
         for page in doc:
             blocks = page.get_text("blocks")
             blocks.sort(key=lambda b: (b[1], b[0]))
-            for block in blocks:
-                text += block[4] + " "
-            text += "\n"
-        return text
+            text = "".join(block[4] + " " for block in blocks)
+            # Image-only page, at most a stray page number in the text layer
+            if len(text.strip()) < MIN_TEXT_CHARS and page.get_images():
+                scanned.append(page.number)
+            pages.append(text)
+        doc.close()
+
+        if ocr and scanned:
+            from .ocr import ocr_pages
+
+            for page_no, text in ocr_pages(file_path, scanned).items():
+                pages[page_no] = text
+        return pages
+
+    @staticmethod
+    def read_sections(file_path):
+        """Return the document as a list of sections (PDF pages / DOCX paragraphs)."""
+        if file_path.lower().endswith(".docx"):
+            return DocumentReader.read_docx_paragraphs(file_path)
+        if file_path.lower().endswith(".pdf"):
+            return DocumentReader.read_pdf_pages(file_path)
+        raise ValueError(f"Unsupported file type: {file_path}")
@@ -0,0 +1,153 @@
+# lexicon.py
+# User pronunciation dictionaries (brand names, acronyms, foreign names),
+# applied to the document text before it is split into chunks.
+#
+# Dictionary files are UTF-8, one entry per line, ``term = replacement`` or
+# ``term<TAB>replacement``; blank lines and lines starting with ``#`` are
+# ignored and later entries override earlier ones. Matching is case-sensitive
+# and both the dictionary and the text are NFC-normalized first: ``\w`` does
+# not match combining marks, so decomposed Vietnamese would split words.
+import hashlib
+import logging
+import os
+import pickle
+import re
+import unicodedata
+
+from .utils import cache_dir
+
+logger = logging.getLogger(__name__)
+
+# Bump when the compiled layout changes so stale caches are rebuilt
+LEXICON_VERSION = 2
+
+# Words and single punctuation marks; whitespace only separates tokens
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_NEXT = re.compile(r"(\s*)(\w+|[^\w\s])")
+# Trie key holding a node's replacement; tokens are never empty
+_VALUE = ""
+
+
+def _keys(term):
+    """Trie keys for ``term``: the first token, then each following token
+    prefixed with a space if whitespace separated it from the previous one."""
+    keys = []
+    for m in _NEXT.finditer(unicodedata.normalize("NFC", term.strip())):
+        keys.append((" " if m.group(1) and keys else "") + m.group(2))
+    return keys
+
+
+class Lexicon:
+    """Token trie for leftmost-longest, word-bounded replacement in one pass.
+
+    Matches start and end on token boundaries, so ``Samsung`` is not replaced
+    inside ``Samsungs`` and ``C++`` not inside ``ABC++``. Nodes are dicts keyed
+    by token; a node that has only a replacement is stored as the bare string,
+    which keeps single-word entries (the bulk of a dictionary) cheap.
+    """
+
+    def __init__(self, root=None, size=0):
+        self.root = root if root is not None else {}
+        self.size = size
+
+    def add(self, term, replacement):
+        keys = _keys(term)
+        if not keys:
+            return
+        node = self.root
+        for key in keys[:-1]:
+            child = node.get(key)
+            if not isinstance(child, dict):
+                child = node[key] = {} if child is None else {_VALUE: child}
+            node = child
+        last = node.get(keys[-1])
+        if isinstance(last, dict):
+            last[_VALUE] = replacement
+        else:
+            node[keys[-1]] = replacement
+        self.size += 1
+
+    @classmethod
+    def parse(cls, lines):
+        lexicon = cls()
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            sep = "\t" if "\t" in line else "="
+            term, _, replacement = line.partition(sep)
+            if term.strip() and replacement.strip():
+                lexicon.add(term, replacement.strip())
+        return lexicon
+
+    @classmethod
+    def load(cls, path, cache_path=None):
+        """Load ``path``, compiling it only if its cached trie is missing.
+
+        The cache (``cache/lexicon`` unless ``cache_path`` is given) is keyed
+        by the dictionary's content hash, so editing the file invalidates it.
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data + str(LEXICON_VERSION).encode()).hexdigest()
+        cached = os.path.join(cache_path or cache_dir("lexicon"), f"{digest}.pickle")
+        try:
+            with open(cached, "rb") as f:
+                root, size = pickle.load(f)
+            return cls(root, size)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            pass
+
+        lexicon = cls.parse(data.decode("utf-8-sig").splitlines())
+        tmp = f"{cached}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump((lexicon.root, lexicon.size), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cached)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not cache lexicon {path}: {e}")
+        logger.info(f"📚 Compiled lexicon {os.path.basename(path)}: {lexicon.size} entries")
+        return lexicon
+
+    def apply(self, text):
+        """Return ``text`` (NFC-normalized) with every dictionary term replaced."""
+        root = self.root
+        text = unicodedata.normalize("NFC", text)
+        if not root:
+            return text
+        parts = []
+        last = 0
+        resume = 0
+        for m in _TOKEN.finditer(text):
+            start = m.start()
+            if start < resume:
+                continue
+            node = root.get(m.group())
+            if node is None:
+                continue
+            end = m.end()
+            match_end = None
+            value = None
+            while True:
+                if isinstance(node, str):
+                    value, match_end = node, end
+                    break
+                if _VALUE in node:
+                    value, match_end = node[_VALUE], end
+                nxt = _NEXT.match(text, end)
+                if nxt is None:
+                    break
+                key = (" " if nxt.group(1) else "") + nxt.group(2)
+                node = node.get(key)
+                if node is None:
+                    break
+                end = nxt.end()
+            if match_end is None:
+                continue
+            parts.append(text[last:start])
+            parts.append(value)
+            last = resume = match_end
+        if not parts:
+            return text
+        parts.append(text[last:])
+        return "".join(parts)
@@ -0,0 +1,34 @@
+# mock_backend.py
+# Offline stand-in for edge_tts.Communicate, used for local testing of the
+# distributed and web pipelines without touching the network. Output is valid
+# silent MP3 (24 kHz mono 48 kbps, like edge_tts) whose length follows the text.
+import asyncio
+import os
+import random
+
+# One MPEG-2 layer III frame, 24 kHz mono 48 kbps, no CRC: 144 bytes, 24 ms.
+# Zeroed side info means zero-length main data, which decodes as silence.
+_SILENT_FRAME = bytes([0xFF, 0xF3, 0x64, 0xC0]) + bytes(140)
+FRAME_MS = 24
+MS_PER_CHAR = 60
+
+
+class MockCommunicate:
+    def __init__(self, text, voice, **kwargs):
+        self.text = text
+        self.voice = voice
+        # Tunable per process so spawned workers inherit the settings
+        self.latency = float(os.environ.get("DOCSPEECH_MOCK_LATENCY", "0.05"))
+        self.error_rate = float(os.environ.get("DOCSPEECH_MOCK_ERROR_RATE", "0"))
+
+    async def stream(self):
+        await asyncio.sleep(random.uniform(0.5, 1.5) * self.latency)
+        if random.random() < self.error_rate:
+            raise ConnectionError("mock backend error")
+        frames = max(1, len(self.text) * MS_PER_CHAR // FRAME_MS)
+        yield {"type": "audio", "data": _SILENT_FRAME * frames}
+
+    async def save(self, audio_fname):
+        with open(audio_fname, "wb") as f:
+            async for message in self.stream():
+                f.write(message["data"])
@@ -0,0 +1,79 @@
+# ocr.py
+# OCR fallback for PDF pages without a text layer. Needs the Tesseract binary
+# with Vietnamese data (tesseract-ocr-vie) plus the pytesseract package.
+import hashlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .utils import cache_dir
+
+logger = logging.getLogger(__name__)
+
+OCR_DPI = 300
+OCR_LANG = "vie"
+
+
+def _init_worker():
+    # Tesseract spawns its own OpenMP threads; with one page per process this
+    # only causes oversubscription, so keep each worker single-threaded.
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def _ocr_page(pdf_path, page_no, lang, cache_path):
+    import fitz  # PyMuPDF
+
+    with fitz.open(pdf_path) as doc:
+        png = doc[page_no].get_pixmap(dpi=OCR_DPI).tobytes("png")
+
+    digest = hashlib.sha256(png + lang.encode()).hexdigest()
+    cached = os.path.join(cache_path, f"{digest}.txt")
+    if os.path.exists(cached):
+        with open(cached, encoding="utf-8") as f:
+            return page_no, f.read()
+
+    import io
+    import pytesseract
+    from PIL import Image
+
+    text = pytesseract.image_to_string(Image.open(io.BytesIO(png)), lang=lang)
+    tmp = f"{cached}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, cached)
+    return page_no, text
+
+
+def ocr_pages(pdf_path, page_numbers, lang=OCR_LANG, max_workers=None):
+    """OCR the given 0-based pages of ``pdf_path`` in a process pool.
+
+    Results are cached on disk by page-image hash. Returns ``{page_no: text}``;
+    pages are left out when OCR is not available.
+    """
+    if not page_numbers:
+        return {}
+    try:
+        import pytesseract
+
+        pytesseract.get_tesseract_version()
+    except Exception as e:
+        logger.warning(f"⚠️ OCR unavailable, skipping {len(page_numbers)} pages: {e}")
+        return {}
+
+    cache_path = cache_dir("ocr")
+    workers = min(max_workers or os.cpu_count() or 1, len(page_numbers))
+    logger.info(f"🔍 OCR {len(page_numbers)} pages with {workers} workers")
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as ex:
+        futures = [
+            ex.submit(_ocr_page, pdf_path, page_no, lang, cache_path)
+            for page_no in page_numbers
+        ]
+        for future in futures:
+            try:
+                page_no, text = future.result()
+                results[page_no] = text
+            except Exception as e:
+                logger.error(f"❌ OCR failed: {e}")
+    return results
@@ -0,0 +1,244 @@
+# pipeline.py
+# The full document -> audio conversion shared by the CLI, desktop and web
+# front ends. Progress is reported through ``on_event`` (see tts.progress).
+import asyncio
+import logging
+import os
+import time
+import uuid
+
+from .audio_formats import DEFAULT_PROFILE
+from .progress import StageFinished, StageStarted
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".docx", ".pdf")
+
+
+def _noop(event):
+    pass
+
+
+def _apply_lexicon(path, sections):
+    from .lexicon import Lexicon
+
+    lexicon = Lexicon.load(path)
+    return [lexicon.apply(section) for section in sections]
+
+
+def _remove_stale_packs(temp_dir, input_key, keep):
+    """Drop source packs of ``input_key`` left by other voice settings."""
+    from .chunk_store import ChunkPack
+
+    for name in os.listdir(temp_dir):
+        path = os.path.join(temp_dir, name)
+        if not name.startswith(f"job_{input_key}_") or not name.endswith(".pack"):
+            continue
+        if path == keep:
+            continue
+        try:
+            ChunkPack(path).remove()
+        except OSError:
+            pass  # in use by a running job
+
+
+async def convert(
+    input_path,
+    output_path,
+    temp_dir,
+    voice="vi-VN-HoaiMyNeural",
+    speed="0%",
+    pitch="+0Hz",
+    concurrent=6,
+    profile=DEFAULT_PROFILE,
+    bitrate=None,
+    sample_rate=None,
+    max_hedge_ratio=0.1,
+    incremental=True,
+    backend="edge",
+    max_length=2000,
+    coalesce=False,
+    lexicon=None,
+    keep_sources=False,
+    on_event=None,
+):
+    """Convert ``input_path`` into ``output_path``.
+
+    With ``incremental`` the sidecar index of a previous output is used to
+    reuse the audio of unchanged chunks. Raises ``ValueError`` for unsupported
+    or empty documents. ``lexicon`` is the path of a pronunciation dictionary
+    (see tts.lexicon) applied to the text before splitting. With
+    ``keep_sources`` the synthesized chunk audio of ``input_path`` is kept in
+    ``temp_dir`` after success (about the size of the output), so later
+    incremental runs reuse it without re-encoding. Returns a dict with chunk
+    counts.
+    """
+    from .audio_combiner import AudioCombiner
+    from .audio_index import AudioIndex, chunk_hash
+    from .chunk_store import ChunkPack
+    from .document_reader import DocumentReader
+    from .text_splitter import TextSplitter
+    from .tts_processor import TTSProcessor
+
+    emit = on_event or _noop
+
+    def stage(name):
+        emit(StageStarted(name))
+        return time.monotonic()
+
+    if not input_path.lower().endswith(SUPPORTED_EXTENSIONS):
+        raise ValueError("Chỉ hỗ trợ DOCX hoặc PDF.")
+
+    t0 = stage("read")
+    sections = await asyncio.to_thread(DocumentReader.read_sections, input_path)
+    emit(StageFinished("read", time.monotonic() - t0))
+    if not any(s.strip() for s in sections):
+        raise ValueError("File rỗng hoặc không đọc được nội dung")
+
+    if lexicon:
+        t0 = stage("lexicon")
+        sections = await asyncio.to_thread(_apply_lexicon, lexicon, sections)
+        emit(StageFinished("lexicon", time.monotonic() - t0))
+
+    t0 = stage("split")
+    chunks = TextSplitter.split_sections(
+        sections, max_length=max_length, coalesce=coalesce
+    )
+    del sections  # the table keeps its own normalized copy
+    emit(StageFinished("split", time.monotonic() - t0))
+    logger.info(f"📝 Tổng số chunk: {len(chunks)}")
+
+    # Output encoding is part of the key: audio cut from a low-bitrate file
+    # must not end up in a higher-quality one written to the same path
+    settings = {
+        "voice": voice,
+        "speed": speed,
+        "pitch": pitch,
+        "profile": profile,
+        "bitrate": bitrate,
+        "sample_rate": sample_rate,
+    }
+    hashes = [chunk_hash(c) for c in chunks]
+
+    # Synthesized audio goes into one pack per input document and voice
+    # settings. It survives a crash, so the next run resumes from the entries
+    # already completed, and with ``keep_sources`` it also survives success,
+    # so an edited document reuses the service's original audio for unchanged
+    # chunks whatever output it is written to. A concurrent run of the same
+    # job gets its own temporary pack, which nothing could find again and is
+    # always removed.
+    input_key = chunk_hash(os.path.abspath(input_path))[:12]
+    voice_key = chunk_hash(f"{voice}|{speed}|{pitch}")[:8]
+    pack_path = os.path.join(temp_dir, f"job_{input_key}_{voice_key}.pack")
+    resumable = True
+    try:
+        pack = ChunkPack(pack_path)
+    except OSError:
+        pack = ChunkPack(f"{pack_path[:-5]}_{uuid.uuid4().hex[:8]}.pack")
+        resumable = False
+
+    # Unchanged chunks come from the pack when possible. Without it (no
+    # keep_sources, first run with it, pack deleted) they are cut from the
+    # previous output, which is lossy: decoding and re-encoding costs a little
+    # quality on every revision.
+    stored = {}
+    reused_spans = {}
+    if incremental:
+        stored = {i: pack.entries[h] for i, h in enumerate(hashes) if h in pack.entries}
+        index = AudioIndex.load(output_path)
+        reusable = index.reusable(settings) if index else {}
+        reused_spans = {
+            i: reusable[h]
+            for i, h in enumerate(hashes)
+            if i not in stored and h in reusable
+        }
+    pending = [
+        i for i in range(len(chunks)) if i not in stored and i not in reused_spans
+    ]
+    if stored or reused_spans:
+        logger.info(
+            f"♻️ Dùng lại {len(stored) + len(reused_spans)} chunk, "
+            f"cần tạo {len(pending)} chunk"
+        )
+
+    completed = False
+    try:
+        t0 = stage("synthesize")
+        tts = TTSProcessor(
+            voice=voice,
+            temp_dir=temp_dir,
+            speed=speed,
+            pitch=pitch,
+            max_hedge_ratio=max_hedge_ratio,
+            backend=backend,
+            store=pack,
+        )
+        results = await tts.process_batch(chunks, pending, concurrent, on_event=on_event)
+        generated = {idx: entry for idx, entry, ok in results if ok}
+        failed = len(pending) - len(generated)
+        emit(StageFinished("synthesize", time.monotonic() - t0))
+
+        parts = {**stored, **generated}
+        order = sorted(list(parts) + list(reused_spans))
+        if not order:
+            raise ValueError("Không có đoạn audio nào được tạo thành công")
+
+        t0 = stage("combine")
+        if reused_spans:
+            reused = sorted(reused_spans)
+            segments = await asyncio.to_thread(
+                AudioCombiner.extract, output_path, [reused_spans[i] for i in reused]
+            )
+            parts.update(zip(reused, segments))
+
+        combiner = AudioCombiner(
+            profile=profile, bitrate=bitrate, sample_rate=sample_rate
+        )
+        spans = await asyncio.to_thread(
+            combiner.combine, [parts[i] for i in order], output_path
+        )
+        AudioIndex.build(
+            settings,
+            [chunks.section(i) for i in order],
+            [hashes[i] for i in order],
+            spans,
+            output_path,
+            total=len(chunks),
+            end_sections=[chunks.end_section(i) for i in order],
+        ).save(output_path)
+        emit(StageFinished("combine", time.monotonic() - t0))
+        completed = True
+    finally:
+        # Keep the pack after a failure so the next run can resume from it
+        if not resumable or (completed and not keep_sources):
+            pack.remove()
+        elif completed:
+            await asyncio.to_thread(pack.compact, hashes)
+            pack.close()
+            _remove_stale_packs(temp_dir, input_key, pack_path)
+        else:
+            pack.close()
+
+    return {
+        "output": output_path,
+        "chunks": len(chunks),
+        "generated": len(generated),
+        "reused": len(stored) + len(reused_spans),
+        "failed": failed,
+    }
+
+
+async def stream(*args, **kwargs):
+    """Async-iterator form of ``convert``: yields events, then the result dict."""
+    events = asyncio.Queue()
+    task = asyncio.ensure_future(convert(*args, on_event=events.put_nowait, **kwargs))
+    task.add_done_callback(lambda _: events.put_nowait(None))
+    try:
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            yield event
+        yield task.result()
+    finally:
+        task.cancel()
@@ -0,0 +1,91 @@
+# progress.py
+# Typed progress events emitted by the pipeline and consumed by the CLI,
+# desktop and web front ends.
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class StageStarted:
+    stage: str  # "read", "split", "synthesize", "combine"
+
+
+@dataclass
+class StageFinished:
+    stage: str
+    seconds: float
+
+
+@dataclass
+class ChunkDone:
+    index: int
+    ok: bool
+    latency: float
+    bytes: int
+
+
+@dataclass
+class ChunkRetry:
+    index: int
+    attempt: int
+
+
+@dataclass
+class Progress:
+    done: int
+    failed: int
+    total: int
+    chunks_per_sec: float
+    bytes_per_sec: float
+    eta_seconds: Optional[float]
+
+
+class ProgressTracker:
+    """Turns chunk completions into ``ChunkDone`` + ``Progress`` events.
+
+    Rates are exponentially weighted over the intervals between completions,
+    so the ETA follows the current throughput without a warm-up run.
+    """
+
+    def __init__(self, total, on_event, alpha=0.2):
+        self.total = total
+        self.on_event = on_event
+        self.alpha = alpha
+        self.done = 0
+        self.failed = 0
+        self.interval = None
+        self.chunk_bytes = None
+        self.last = time.monotonic()
+
+    def _ewma(self, current, sample):
+        if current is None:
+            return sample
+        return self.alpha * sample + (1 - self.alpha) * current
+
+    def retry(self, index, attempt):
+        self.on_event(ChunkRetry(index, attempt))
+
+    def chunk_done(self, index, ok, latency, nbytes):
+        now = time.monotonic()
+        self.interval = self._ewma(self.interval, now - self.last)
+        self.chunk_bytes = self._ewma(self.chunk_bytes, nbytes)
+        self.last = now
+        if ok:
+            self.done += 1
+        else:
+            self.failed += 1
+
+        remaining = self.total - self.done - self.failed
+        rate = 1 / self.interval if self.interval else 0.0
+        self.on_event(ChunkDone(index, ok, latency, nbytes))
+        self.on_event(
+            Progress(
+                done=self.done,
+                failed=self.failed,
+                total=self.total,
+                chunks_per_sec=rate,
+                bytes_per_sec=self.chunk_bytes * rate,
+                eta_seconds=remaining * self.interval if self.interval else None,
+            )
+        )
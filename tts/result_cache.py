@@ -0,0 +1,105 @@
+# result_cache.py
+# Content-addressed cache of finished conversions for the web UI.
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+from .audio_index import AudioIndex
+
+logger = logging.getLogger(__name__)
+
+
+class HashedUpload:
+    """Upload spool file in ``directory`` that hashes data as it is written.
+
+    Meant to be returned from a request's file stream factory, so the form
+    parser writes the upload to disk once and the content hash is ready when
+    parsing ends, without reading the file back. Other file methods go to the
+    underlying temporary file. Each upload gets its own file, which its owner
+    deletes with ``remove``.
+    """
+
+    def __init__(self, directory, suffix=""):
+        self.file = tempfile.NamedTemporaryFile(
+            dir=directory, prefix="upload_", suffix=suffix, delete=False
+        )
+        self.path = self.file.name
+        self.digest = hashlib.sha256()
+
+    def write(self, data):
+        self.digest.update(data)
+        return self.file.write(data)
+
+    def hexdigest(self):
+        return self.digest.hexdigest()
+
+    def remove(self):
+        self.file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+
+class ResultCache:
+    """Output files named by request key, evicted LRU beyond ``quota_bytes``."""
+
+    def __init__(self, directory, quota_bytes):
+        self.directory = directory
+        self.quota_bytes = quota_bytes
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(content_hash, voice, speed, pitch, profile):
+        raw = "|".join([content_hash, voice, speed, pitch, profile])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+    def path(self, key, ext):
+        return os.path.join(self.directory, key + ext)
+
+    def lookup(self, key, ext):
+        """Return the cached output path and mark it recently used, or None.
+
+        Only outputs whose index matches the file and covers every chunk
+        count; partial results (failed chunks, interrupted writes) are redone.
+        """
+        path = self.path(key, ext)
+        index = AudioIndex.load(path)
+        if index is None or not index.complete:
+            return None
+        os.utime(path)
+        return path
+
+    def evict(self, keep=()):
+        """Delete least recently used outputs (with their index) over quota."""
+        with self.lock:
+            files = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if (
+                    entry.is_file()
+                    and not entry.name.startswith(".")
+                    and not entry.name.endswith(".tmp")
+                ):
+                    stat = entry.stat()
+                    total += stat.st_size
+                    if not entry.name.endswith(".index.json"):
+                        files.append((stat.st_mtime, entry.path, stat.st_size))
+            files.sort()
+            for _, path, size in files:
+                if total <= self.quota_bytes:
+                    break
+                if path in keep:
+                    continue
+                for victim in (path, path + ".index.json"):
+                    try:
+                        total -= os.path.getsize(victim)
+                        os.remove(victim)
+                    except OSError:
+                        pass
+                logger.info(f"🗑️ Evicted {os.path.basename(path)} from cache")
@@ -1,36 +1,172 @@
 # text_splitter.py
 import re
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+
+SENTENCE_END = re.compile(r"[.!?…:;]['\"”’»)\]]*$")
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+CLAUSE_BREAK = re.compile(r"(?<=[,;:])\s+")
+
+
+class ChunkTable:
+    """Chunks stored as ``[start, end)`` offsets into one normalized buffer.
+
+    ``text`` holds every non-empty section, whitespace-collapsed and joined by
+    single spaces. ``section_starts`` / ``section_ids`` map buffer offsets back
+    to the original section (page for PDF, paragraph for DOCX), so any chunk's
+    section is a bisect away. Chunk strings are only built when indexed.
+    """
+
+    __slots__ = ("text", "starts", "ends", "section_starts", "section_ids")
+
+    def __init__(self, text, starts, ends, section_starts, section_ids):
+        self.text = text
+        self.starts = starts
+        self.ends = ends
+        self.section_starts = section_starts
+        self.section_ids = section_ids
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, i):
+        return self.text[self.starts[i] : self.ends[i]]
+
+    def __iter__(self):
+        text = self.text
+        for start, end in zip(self.starts, self.ends):
+            yield text[start:end]
+
+    def section(self, i):
+        """Index of the section chunk ``i`` starts in."""
+        pos = bisect_right(self.section_starts, self.starts[i]) - 1
+        return self.section_ids[pos]
+
+    def end_section(self, i):
+        """Index of the section chunk ``i`` ends in."""
+        pos = bisect_right(self.section_starts, self.ends[i] - 1) - 1
+        return self.section_ids[pos]
+
+    def sections(self):
+        return [self.section(i) for i in range(len(self))]
+
+    def chunk_range(self, first, last):
+        """Chunk indices ``[lo, hi)`` overlapping sections ``first..last``."""
+        lo_sec = bisect_left(self.section_ids, first)
+        hi_sec = bisect_right(self.section_ids, last)
+        if lo_sec >= hi_sec:
+            return 0, 0
+        lo = bisect_right(self.ends, self.section_starts[lo_sec])
+        if hi_sec < len(self.section_starts):
+            hi = bisect_left(self.starts, self.section_starts[hi_sec])
+        else:
+            hi = len(self)
+        return lo, hi
 
 
 class TextSplitter:
     @staticmethod
     def smart_split(text, max_length=2000):
         text = re.sub(r"\s+", " ", text.strip())
-        sentences = re.split(r"(?<=[.!?])\s+", text)
-        chunks = []
-        current = ""
+        return [
+            text[start:end]
+            for start, end in TextSplitter._split_spans(text, 0, len(text), max_length)
+        ]
 
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
+    @staticmethod
+    def _split_spans(text, start, end, max_length):
+        """Yield chunk spans of the normalized ``text[start:end]``.
+
+        Pieces are separated by single spaces, so a run of consecutive pieces
+        is itself a slice of ``text`` and no intermediate strings are built.
+        """
+        cur_start = cur_end = None
+
+        def pieces(pattern, lo, hi):
+            pos = lo
+            for m in pattern.finditer(text, lo, hi):
+                yield pos, m.start()
+                pos = m.end()
+            yield pos, hi
+
+        def add(lo, hi):
+            nonlocal cur_start, cur_end
+            if cur_start is not None and (cur_end - cur_start + 1) + (hi - lo) + 2 <= max_length:
+                cur_end = hi
+                return None
+            done = (cur_start, cur_end) if cur_start is not None else None
+            cur_start, cur_end = lo, hi
+            return done
+
+        for lo, hi in pieces(SENTENCE_BREAK, start, end):
+            if lo == hi:
                 continue
-            if len(sentence) > max_length:
-                subs = re.split(r"(?<=[,;:])\s+", sentence)
-                for part in subs:
-                    if len(current) + len(part) + 2 <= max_length:
-                        current += part + " "
-                    else:
-                        if current:
-                            chunks.append(current.strip())
-                        current = part + " "
+            if hi - lo > max_length:
+                parts = pieces(CLAUSE_BREAK, lo, hi)
             else:
-                if len(current) + len(sentence) + 2 <= max_length:
-                    current += sentence + " "
-                else:
-                    if current:
-                        chunks.append(current.strip())
-                    current = sentence + " "
-        if current:
-            chunks.append(current.strip())
-
-        return chunks
+                parts = ((lo, hi),)
+            for part_lo, part_hi in parts:
+                done = add(part_lo, part_hi)
+                if done:
+                    yield done
+        if cur_start is not None:
+            yield cur_start, cur_end
+
+    @staticmethod
+    def split_sections(sections, max_length=2000, coalesce=False):
+        """Split a list of sections into a :class:`ChunkTable`.
+
+        Consecutive short sections are packed together, but groups that are at
+        least half full are also closed at content-defined anchors so that
+        editing one section only changes the chunks around it instead of
+        shifting every later chunk boundary. This keeps the chunk hashes stable
+        for incremental re-render without cutting runs of short paragraphs into
+        many small requests.
+
+        With ``coalesce`` every paragraph ends in punctuation so the service
+        renders the pause between paragraphs packed into one request.
+        """
+        parts = []
+        section_starts = array("q")
+        section_ids = array("l")
+        offset = 0
+        for idx, section in enumerate(sections):
+            section = re.sub(r"\s+", " ", section.strip())
+            if not section:
+                continue
+            if coalesce and not SENTENCE_END.search(section):
+                section += "."
+            section_starts.append(offset)
+            section_ids.append(idx)
+            parts.append(section)
+            offset += len(section) + 1
+        text = " ".join(parts)
+
+        starts = array("q")
+        ends = array("q")
+        group_start = None
+        size = 0
+
+        def flush(group_end):
+            for start, end in TextSplitter._split_spans(
+                text, group_start, group_end, max_length
+            ):
+                starts.append(start)
+                ends.append(end)
+
+        for section, start in zip(parts, section_starts):
+            if group_start is not None and size + len(section) + 1 > max_length:
+                flush(start - 1)
+                group_start, size = None, 0
+            if group_start is None:
+                group_start = start
+            size += len(section) + 1
+            anchor = zlib.crc32(section.encode("utf-8")) % 4 == 0
+            if anchor and size >= max_length // 2:
+                flush(start + len(section))
+                group_start, size = None, 0
+        if group_start is not None:
+            flush(len(text))
+
+        return ChunkTable(text, starts, ends, section_starts, section_ids)
@@ -1,37 +1,107 @@
 # tts_processor.py
 import asyncio
 import os
+import time
+from collections import deque
 import edge_tts
 import logging
 
+from .audio_index import chunk_hash
+from .chunk_store import PackEntry
+from .progress import ProgressTracker
+
 logger = logging.getLogger(__name__)
 
 
+def _signed(value):
+    # edge_tts wants an explicit sign: "0%" -> "+0%"
+    return value if value[:1] in "+-" else "+" + value
+
+
+def _audio_size(audio):
+    if isinstance(audio, PackEntry):
+        return audio.length
+    return os.path.getsize(audio) if audio else 0
+
+
+class LatencyTracker:
+    """Rolling window of recent successful chunk latencies."""
+
+    def __init__(self, window=200, percentile=0.95, min_samples=10):
+        self.samples = deque(maxlen=window)
+        self.percentile = percentile
+        self.min_samples = min_samples
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+
+    def threshold(self):
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))]
+
+
 class TTSProcessor:
-    def __init__(self, voice, temp_dir, speed="0%", pitch="+0Hz"):
+    def __init__(
+        self,
+        voice,
+        temp_dir,
+        speed="0%",
+        pitch="+0Hz",
+        hedge_percentile=0.95,
+        max_hedge_ratio=0.1,
+        backend="edge",
+        store=None,
+    ):
         self.voice = voice
         self.temp_dir = temp_dir
+        # With a ChunkPack the audio is appended to it instead of being
+        # written to one file per chunk; results then carry a PackEntry.
+        self.store = store
         self.speed = speed
         self.pitch = pitch
+        # A duplicate request is sent for chunks slower than this percentile
+        # of recent latencies, for at most max_hedge_ratio extra requests.
+        self.latency = LatencyTracker(percentile=hedge_percentile)
+        self.max_hedge_ratio = max_hedge_ratio
+        self.requests = 0
+        self.hedges = 0
+        if backend == "mock":
+            from .mock_backend import MockCommunicate
 
-    async def process_chunk(self, chunk, index):
-        temp_path = os.path.join(self.temp_dir, f"chunk_{index:04d}.mp3")
+            self.communicate_cls = MockCommunicate
+        else:
+            self.communicate_cls = edge_tts.Communicate
+
+    async def process_chunk(self, chunk, index, hedge=False):
+        name = f"chunk_{index:04d}_h.mp3" if hedge else f"chunk_{index:04d}.mp3"
+        temp_path = os.path.join(self.temp_dir, name)
         chunk = chunk.strip()
         if not chunk:
             logger.warning(f"Chunk {index} is empty, skipping")
             return index, "", False
+        key = chunk_hash(chunk)
 
         try:
-            if self.speed != "0%" or self.pitch != "+0Hz":
-                chunk = (
-                    chunk.replace("&", "&amp;")
-                    .replace("<", "&lt;")
-                    .replace(">", "&gt;")
-                )
-                ssml = f'<speak version="1.0" xml:lang="vi-VN"><prosody rate="{self.speed}" pitch="{self.pitch}">{chunk}</prosody></speak>'
-                communicate = edge_tts.Communicate(ssml, self.voice)
-            else:
-                communicate = edge_tts.Communicate(chunk, self.voice)
+            # edge_tts escapes its input and builds the SSML itself, so prosody
+            # goes through its parameters rather than hand-written markup.
+            communicate = self.communicate_cls(
+                chunk, self.voice, rate=_signed(self.speed), pitch=_signed(self.pitch)
+            )
+
+            if self.store is not None:
+                data = bytearray()
+                async for message in communicate.stream():
+                    if message["type"] == "audio":
+                        data += message["data"]
+                await asyncio.sleep(0.2)
+                if len(data) > 100:
+                    entry = self.store.append(key, bytes(data))
+                    logger.info(f"✅ Chunk {index + 1} done: {len(data)} bytes")
+                    return index, entry, True
+                logger.error(f"❌ Chunk {index + 1} failed, audio too small")
+                return index, "", False
 
             await communicate.save(temp_path)
             await asyncio.sleep(0.2)
@@ -43,29 +113,104 @@ class TTSProcessor:
                 logger.error(f"❌ Chunk {index + 1} failed, file too small or missing")
                 return index, "", False
 
+        except asyncio.CancelledError:
+            # Lost the race against a hedged duplicate
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
         except Exception as e:
             logger.error(f"❌ Exception in chunk {index + 1}: {e}")
             if os.path.exists(temp_path):
                 os.remove(temp_path)
             return index, "", False
 
-    async def process_batch(self, chunks, max_concurrent):
-        semaphore = asyncio.Semaphore(max_concurrent)
+    async def _timed_chunk(self, chunk, index, hedge=False):
+        self.requests += 1
+        start = time.monotonic()
+        result = await self.process_chunk(chunk, index, hedge)
+        if result[2]:
+            self.latency.record(time.monotonic() - start)
+        return result
+
+    def _can_hedge(self):
+        return self.hedges < self.max_hedge_ratio * self.requests
 
-        async def worker(chunk, idx):
-            async with semaphore:
-                for attempt in range(3):
-                    logger.info(f"🚀 Processing chunk {idx + 1}, attempt {attempt + 1}")
-                    result = await self.process_chunk(chunk, idx)
+    async def process_hedged(self, chunk, index):
+        """Run one attempt, duplicating it if it becomes a straggler."""
+        start = time.monotonic()
+        pending = {asyncio.create_task(self._timed_chunk(chunk, index))}
+        threshold = self.latency.threshold()
+        hedged = False
+        result = (index, "", False)
+        try:
+            while pending:
+                timeout = None
+                if not hedged and threshold is not None:
+                    timeout = max(0.0, threshold - (time.monotonic() - start))
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = True
+                    if self._can_hedge():
+                        self.hedges += 1
+                        logger.info(
+                            f"🐢 Chunk {index + 1} slower than {threshold:.1f}s, hedging"
+                        )
+                        pending.add(
+                            asyncio.create_task(self._timed_chunk(chunk, index, True))
+                        )
+                    continue
+                for task in done:
+                    result = task.result()
                     if result[2]:
                         return result
-                    logger.warning(
-                        f"⚠️ Chunk {idx + 1} failed attempt {attempt + 1}, retrying..."
+            return result
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def process_batch(self, chunks, indices, max_concurrent, on_event=None):
+        """Synthesize ``chunks[i]`` for each ``i`` in ``indices``.
+
+        ``chunks`` is typically the document's ``ChunkTable``; each chunk is
+        sliced out only when a worker picks it up, and results and
+        ``tts.progress`` events (sent to ``on_event``) carry the document
+        index. Returns ``(index, entry, ok)`` tuples in ``indices`` order.
+        """
+        tracker = ProgressTracker(len(indices), on_event) if on_event else None
+        results = {}
+        queue = iter(indices)
+
+        async def attempts(chunk, idx):
+            for attempt in range(3):
+                logger.info(f"🚀 Processing chunk {idx + 1}, attempt {attempt + 1}")
+                result = await self.process_hedged(chunk, idx)
+                if result[2]:
+                    return result
+                logger.warning(
+                    f"⚠️ Chunk {idx + 1} failed attempt {attempt + 1}, retrying..."
+                )
+                if tracker:
+                    tracker.retry(idx, attempt + 1)
+                await asyncio.sleep(2 * (attempt + 1))
+            logger.error(f"❌ Chunk {idx + 1} failed after 3 attempts")
+            return result
+
+        async def worker():
+            # Workers share one iterator, so only max_concurrent chunks are
+            # in flight and nothing is sliced or scheduled ahead of them
+            for idx in queue:
+                start = time.monotonic()
+                result = await attempts(chunks[idx], idx)
+                results[idx] = result
+                if tracker:
+                    tracker.chunk_done(
+                        idx, result[2], time.monotonic() - start, _audio_size(result[1])
                     )
-                    await asyncio.sleep(2 * (attempt + 1))
-                logger.error(f"❌ Chunk {idx + 1} failed after 3 attempts")
-                return result
 
-        tasks = [worker(chunk, idx) for idx, chunk in enumerate(chunks)]
-        results = await asyncio.gather(*tasks)
-        return results
+        await asyncio.gather(
+            *(worker() for _ in range(max(1, min(max_concurrent, len(indices)))))
+        )
+        return [results[idx] for idx in indices]
@@ -13,6 +13,12 @@ def setup_dirs():
     return input_dir, output_dir, temp_dir
 
 
+def cache_dir(name):
+    path = os.path.join(os.path.dirname(__file__), "../cache", name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
 def format_seconds(seconds):
     hours = int(seconds) // 3600
     minutes = (int(seconds) % 3600) // 60
@@ -1,65 +1,269 @@
-from flask import Flask, request, send_from_directory
+from flask import Flask, Request, jsonify, redirect, request, send_from_directory
+from markupsafe import escape
 import os
 import asyncio
-from tts.document_reader import DocumentReader
-from tts.text_splitter import TextSplitter
-from tts.tts_processor import TTSProcessor
-from tts.audio_combiner import AudioCombiner
+import threading
+import time
+import uuid
+from tts.pipeline import convert
+from tts.progress import Progress, StageStarted
+from tts.audio_index import AudioIndex
+from tts.audio_formats import DEFAULT_PROFILE, FORMAT_PROFILES, output_extension
+from tts.result_cache import HashedUpload, ResultCache
 from tts.utils import setup_dirs
 from werkzeug.utils import secure_filename
 
-app = Flask(__name__)
-UPLOAD_FOLDER = "./input"
-OUTPUT_FOLDER = "./output"
+# Uploads only live while their request or job needs them; anything left here
+# was orphaned by a crash and is cleared on startup
+UPLOAD_FOLDER = os.path.abspath("./input/web")
+# Results get their own folder: the cache quota evicts every file in it, so
+# it must not be shared with the CLI/desktop output folder
+OUTPUT_FOLDER = os.path.abspath("./output/web")
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+for name in os.listdir(UPLOAD_FOLDER):
+    os.remove(os.path.join(UPLOAD_FOLDER, name))
+
+
+class HashingRequest(Request):
+    """Spools file uploads straight to UPLOAD_FOLDER, hashing them on the way."""
+
+    def _get_file_stream(
+        self, total_content_length, content_type, filename=None, content_length=None
+    ):
+        suffix = os.path.splitext(secure_filename(filename or ""))[1].lower()
+        return HashedUpload(UPLOAD_FOLDER, suffix)
+
+
+app = Flask(__name__)
+app.request_class = HashingRequest
+
+VOICES = ["vi-VN-HoaiMyNeural", "vi-VN-NamMinhNeural"]
+BACKEND = os.environ.get("DOCSPEECH_BACKEND", "edge")
+CACHE_QUOTA_MB = int(os.environ.get("DOCSPEECH_CACHE_QUOTA_MB", "2048"))
+cache = ResultCache(OUTPUT_FOLDER, CACHE_QUOTA_MB * 1024 * 1024)
+# Finished jobs are forgotten this long after they end
+JOB_TTL_SECONDS = 3600
+
+# job_id -> state shown by /progress; written by the job thread only
+JOBS = {}
+# cache key -> job_id of the conversion producing it, so identical requests
+# arriving while it runs attach to the same job
+IN_FLIGHT = {}
+JOBS_LOCK = threading.Lock()
 
 
 @app.route("/", methods=["GET", "POST"])
 def index():
     if request.method == "POST":
-        f = request.files["file"]
-        filename = secure_filename(f.filename)
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        f.save(filepath)
-
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(process(filepath, filename))
-
-        output_file = os.path.splitext(filename)[0] + ".mp3"
-        return f"""
-        <p>✅ Xong! <a href="/download/{output_file}">Tải file</a></p>
-        """
+        started = None
+        try:
+            response, started = submit(request.files["file"])
+        finally:
+            # Uploads not handed to a job (rejected, cached, joined another
+            # job, extra file fields) are done with; the job deletes its own
+            for storage in request.files.values():
+                if storage.stream is not started:
+                    storage.stream.remove()
+        return response
 
     return """
     <h2>Upload DOCX hoặc PDF</h2>
     <form method=post enctype=multipart/form-data>
       <input type=file name=file>
+      <select name=voice>{voices}</select>
+      <select name=format>{options}</select>
       <input type=submit value=Upload>
     </form>
+    """.format(
+        voices="".join(f"<option>{v}</option>" for v in VOICES),
+        options="".join(
+            f"<option{' selected' if p == DEFAULT_PROFILE else ''}>{p}</option>"
+            for p in sorted(FORMAT_PROFILES)
+        )
+    )
+
+
+def submit(f):
+    """Start or join the job for upload ``f``.
+
+    Returns the response and the upload now owned by a job thread, if any.
     """
+    filename = secure_filename(f.filename)
+    suffix = os.path.splitext(filename)[1].lower()
+    if suffix not in (".docx", ".pdf"):
+        return ("<p>❌ Chỉ hỗ trợ DOCX hoặc PDF.</p>", 400), None
+    profile = request.form.get("format", DEFAULT_PROFILE)
+    if profile not in FORMAT_PROFILES:
+        return (f"<p>❌ Định dạng không hợp lệ: {escape(profile)}</p>", 400), None
+    voice = request.form.get("voice", VOICES[0])
+    if voice not in VOICES:
+        return (f"<p>❌ Giọng không hợp lệ: {escape(voice)}</p>", 400), None
+    speed, pitch = "0%", "+0Hz"
+
+    upload = f.stream
+    upload.close()
+    key = ResultCache.key(upload.hexdigest(), voice, speed, pitch, profile)
+    ext = output_extension(profile)
+    # Per request: a request joining a running job keeps its own file name
+    download_name = os.path.splitext(filename)[0] + ext
+
+    with JOBS_LOCK:
+        prune_jobs()
+        if key in IN_FLIGHT:
+            return redirect(f"/job/{IN_FLIGHT[key]}?name={download_name}"), None
+        job_id = uuid.uuid4().hex
+        cached = cache.lookup(key, ext)
+        JOBS[job_id] = {
+            "status": "done" if cached else "running",
+            "stage": "cached" if cached else "queued",
+            "done": 0,
+            "total": 0,
+            "eta_seconds": None,
+            "output": key + ext,
+            "error": None,
+            "finished_at": time.monotonic() if cached else None,
+        }
+        if cached:
+            return redirect(f"/job/{job_id}?name={download_name}"), None
+        IN_FLIGHT[key] = job_id
+
+    settings = {"voice": voice, "speed": speed, "pitch": pitch, "profile": profile}
+    threading.Thread(
+        target=run_job, args=(job_id, key, upload, settings), daemon=True
+    ).start()
+    return redirect(f"/job/{job_id}?name={download_name}"), upload
 
 
-async def process(path, filename):
-    _, output_dir, temp_dir = setup_dirs()
-    text = (
-        DocumentReader.read_docx(path)
-        if filename.endswith(".docx")
-        else DocumentReader.read_pdf(path)
+def prune_jobs():
+    """Drop jobs that finished over JOB_TTL_SECONDS ago; call with JOBS_LOCK held."""
+    cutoff = time.monotonic() - JOB_TTL_SECONDS
+    for job_id in [
+        j for j, job in JOBS.items() if job["finished_at"] and job["finished_at"] < cutoff
+    ]:
+        del JOBS[job_id]
+
+
+def run_job(job_id, key, upload, settings):
+    job = JOBS[job_id]
+
+    def on_event(event):
+        if isinstance(event, StageStarted):
+            job["stage"] = event.stage
+        elif isinstance(event, Progress):
+            job["done"] = event.done + event.failed
+            job["total"] = event.total
+            job["eta_seconds"] = event.eta_seconds
+
+    output_path = os.path.join(OUTPUT_FOLDER, job["output"])
+    try:
+        asyncio.run(process(upload.path, output_path, settings, on_event))
+        job["status"] = "done"
+    except Exception as e:
+        job["status"] = "error"
+        job["error"] = str(e)
+    finally:
+        upload.remove()
+        with JOBS_LOCK:
+            IN_FLIGHT.pop(key, None)
+            # Only now, so a job is never pruned while requests can join it
+            job["finished_at"] = time.monotonic()
+            running = {
+                os.path.join(OUTPUT_FOLDER, JOBS[j]["output"])
+                for j in IN_FLIGHT.values()
+            }
+        cache.evict(keep=running | {output_path})
+
+
+async def process(path, output_path, settings, on_event=None):
+    _, _, temp_dir = setup_dirs()
+    return await convert(
+        path,
+        output_path,
+        temp_dir,
+        voice=settings["voice"],
+        speed=settings["speed"],
+        pitch=settings["pitch"],
+        concurrent=4,
+        profile=settings["profile"],
+        backend=BACKEND,
+        keep_sources=False,
+        on_event=on_event,
     )
-    chunks = TextSplitter.smart_split(text)
-    tts = TTSProcessor("vi-VN-HoaiMyNeural", temp_dir)
-    results = await tts.process_batch(chunks, 4)
-    success_files = [p for _, p, ok in results if ok]
-    combiner = AudioCombiner()
-    output_path = os.path.join(output_dir, os.path.splitext(filename)[0] + ".mp3")
-    combiner.combine(success_files, output_path)
+
+
+@app.route("/job/<job_id>")
+def job_page(job_id):
+    if job_id not in JOBS:
+        return "<p>❌ Không tìm thấy công việc</p>", 404
+    output_file = JOBS[job_id]["output"]
+    download_name = secure_filename(request.args.get("name", "")) or output_file
+    return f"""
+    <p id=status>⏳ Đang xử lý...</p>
+    <p id=links hidden>✅ Xong!
+    <a href="/download/{output_file}?name={download_name}">Tải file</a>
+    | <a href="/listen/{output_file}">Nghe</a></p>
+    <script>
+    async function poll() {{
+      const job = await (await fetch("/progress/{job_id}")).json();
+      if (job.status === "done") {{
+        document.getElementById("status").hidden = true;
+        document.getElementById("links").hidden = false;
+        return;
+      }}
+      if (job.status === "error") {{
+        document.getElementById("status").textContent = "❌ Lỗi: " + job.error;
+        return;
+      }}
+      const eta = job.eta_seconds === null ? "--" : Math.round(job.eta_seconds) + "s";
+      document.getElementById("status").textContent =
+        `⏳ ${{job.stage}}: ${{job.done}}/${{job.total}} đoạn, còn lại ~${{eta}}`;
+      setTimeout(poll, 1000);
+    }}
+    poll();
+    </script>
+    """
+
+
+@app.route("/progress/<job_id>")
+def progress(job_id):
+    if job_id not in JOBS:
+        return jsonify(error="not found"), 404
+    return jsonify(JOBS[job_id])
 
 
 @app.route("/download/<filename>")
 def download(filename):
-    return send_from_directory(OUTPUT_FOLDER, filename, as_attachment=True)
+    name = secure_filename(request.args.get("name", "")) or filename
+    return send_from_directory(
+        OUTPUT_FOLDER, filename, as_attachment=True, download_name=name
+    )
+
+
+@app.route("/audio/<filename>")
+def audio(filename):
+    # Served inline so the browser can issue Range requests when seeking.
+    return send_from_directory(OUTPUT_FOLDER, filename, conditional=True)
+
+
+@app.route("/listen/<filename>")
+def listen(filename):
+    filename = secure_filename(filename)
+    page = request.args.get("page", type=int)
+    start = 0
+    if page:
+        index = AudioIndex.load(os.path.join(OUTPUT_FOLDER, filename))
+        entry = index.seek(page) if index else None
+        if entry is None:
+            return f"<p>❌ Không tìm thấy trang {page}</p>", 404
+        start = entry["start_ms"] / 1000
+    return f"""
+    <form method=get>
+      Trang: <input type=number name=page min=1 value="{page or 1}">
+      <input type=submit value="Đi tới">
+    </form>
+    <audio controls autoplay src="/audio/{filename}#t={start:.3f}"></audio>
+    """
 
 
 if __name__ == "__main__":